@@ -0,0 +1,73 @@
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import torch
+
+from src import load_config, ansi
+from src.model import Trainer, BATCHING
+
+
+# hyperparameters of the models missing from the config
+HYPERPARAMETERS = {
+    "fnn": {"hidden_dims": [64, 64], "dropout": 0.2},
+    "multi_head_fnn": {"hidden_dims": [64, 64], "dropout": 0.2, "n_heads": 4, "bootstrap": 0.5},
+    "gp": {"n_inducing_points": 32, "kernel": "rq", "mean": "constant"},
+    "streaming_gp": {"n_inducing_points": 32, "kernel": "rq", "mean": "constant"},
+}
+
+
+def benchmark(config_path: str, models: list[str], samples: int, rounds: int) -> None:
+    """
+    steps per second of a training round with every batching path
+    """
+    config = load_config(config_path).model
+    targets = list(config.targets) if config.single_model or config.ensemble else config.targets[:1]
+
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((samples, len(config.features))).astype(np.float32)
+    y = rng.standard_normal((samples, len(targets))).astype(np.float32)
+
+    for model in models:
+        hps = config.hyperparameters if model == config.model else HYPERPARAMETERS[model]
+
+        lines = []
+        for batching in BATCHING:
+            torch.manual_seed(0)
+            trainer = Trainer(config._replace(model=model, hyperparameters=hps, batching=batching, lr_decay=1.0), targets)
+
+            # the first round pays the warm-up
+            with contextlib.redirect_stdout(io.StringIO()):
+                trainer.train(x, y)
+
+                start = time.perf_counter()
+                steps = trainer.steps
+                for _ in range(rounds):
+                    trainer.train(x, y)
+
+            duration = time.perf_counter() - start
+            lines.append(
+                f"   |> {batching}: {(trainer.steps - steps) / duration:.0f} steps/s | "
+                f"{duration / rounds * 1000:.1f} ms/round"
+            )
+
+        print(
+            f"{ansi.BOLD}{ansi.BLUE}-> {model}{ansi.RESET}",
+            f"   |> x: {x.shape} | epochs: {config.epochs} | batch size: {config.batch_size}",
+            *lines,
+            sep="\n",
+            end="\n\n",
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", type=str, default="configs/forces.toml")
+    parser.add_argument("--models", type=str, nargs="+", default=["fnn", "multi_head_fnn", "gp"])
+    parser.add_argument("--samples", type=int, default=512, help="samples per training round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    benchmark(args.config, args.models, args.samples, args.rounds)
@@ -0,0 +1,25 @@
+import argparse
+
+from src import ansi
+from src.recorder import export_csv
+
+
+def main(paths: list[str]) -> None:
+    for path in paths:
+        filename = export_csv(path)
+
+        print(
+            f"{ansi.BOLD}{ansi.GREEN}-> session exported{ansi.RESET}",
+            f"   |> from: {path}",
+            f"   |> to: {filename}",
+            sep="\n",
+            end="\n\n",
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="export recorded sessions as csv")
+    parser.add_argument("paths", type=str, nargs="+")
+    args = parser.parse_args()
+
+    main(args.paths)
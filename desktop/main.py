@@ -1,17 +1,24 @@
 import queue
-import time
 import argparse
-
-import numpy as np
+import time
 
 from src import (
     Server,
-    Plotter,
+    AsyncServer,
     load_config,
-    Data,
     ansi,
-    Model,
     Client,
+    Session,
+    ModelPool,
+    create_models,
+    RingBuffer,
+    LatencyMonitor,
+    Replay,
+    Scheduler,
+    ControlThread,
+    Latest,
+    Summary,
+    CheckpointStore,
 )
 
 
@@ -22,214 +29,223 @@ def get(data: queue.Queue):
         return None
 
 
-def train_model(model,
-                trained_until: int,
-                data_len: int,
-                max_samples: int,
-                data: Data,
-                target: str | list[str],
-                ) -> None:
-    if model.is_training:
-        return
-
-    slc = slice(trained_until, data_len)
-    if data_len - trained_until > max_samples:
-        slc = slice(-max_samples, None)
-
-    x = np.array([
-        data["s0"][slc] / 100,
-        data["s1"][slc] / 100,
-        data["s2"][slc] / 100,
-        data["s3"][slc] / 100,
-    ]).T
-
-    if isinstance(target, str):
-        y = data[target][slc]
-    else:
-        y = np.array([data[t][slc] for t in target]).T
-
-    model.start(x, y)
-
-
-def main(config_path: str) -> None:
+def main(config_path: str,
+         replay_path: str | None = None,
+         speed: float = 1.0,
+         headless: bool = False,
+         object: str | None = None,
+         ) -> None:
     config = load_config(config_path)
+    if object is not None:
+        config = config._replace(checkpoint=config.checkpoint._replace(object=object))
+
+    headless = headless or not config.plot.enabled
+    multi_client = config.server.multi_client
 
     # queue for data exchange between server and plotter
     data_queue = queue.Queue()
     event_queue = queue.Queue()
 
-    # server
-    server = Server(data_queue, event_queue, config.server.timeout)
-    server.start(config.server.ip, config.server.port)
-
-    # plots
-    plotter = Plotter(config)
+    if config.server.buffer == "ring" and multi_client:
+        print(
+            f"{ansi.BOLD}{ansi.YELLOW_BRIGHT}-> ring buffer not available{ansi.RESET}",
+            "   |> multi-client data is tagged by source",
+            "   |> using a queue instead",
+            sep="\n",
+            end="\n\n",
+        )
 
-    # data
-    data = Data(config.data.path, config.data.save, config.data.date_format)
-
-    # model
-    model = None
-    fx_model = None
-    fy_model = None
-    fz_model = None
-
-    if config.model.single_model:
-        model = Model(config.model)
-    else:
-        fx_model = Model(config.model)
-        fy_model = Model(config.model)
-        fz_model = Model(config.model)
+    elif config.server.buffer == "ring":
+        data_queue = RingBuffer(config.server.ring_size, policy=config.server.ring_policy)
 
-    trained_until = 0
-    predicted_until = 0
+    # receipt, ingest and send latencies
+    latency = LatencyMonitor()
 
-    # client
-    client = Client(config.client.ip, config.client.port) if config.client.control else None
+    # newest sample for the control thread, bypassing the data queue
+    latest = Latest()
 
-    learning_time_exceeded = False
-    start_time = time.time()
-    client_connected = False
-
-    while True:
-        try:
-            event = get(event_queue)
+    # server
+    server_cls = AsyncServer if config.server.backend == "asyncio" else Server
+    server = server_cls(
+        data_queue,
+        event_queue,
+        config.server.timeout,
+        protocol=config.server.protocol,
+        batch=config.server.batch,
+        rcvbuf=config.server.rcvbuf,
+        fill_gaps=config.server.fill_gaps,
+        multi_client=multi_client,
+        latency=latency,
+        latest=latest,
+    )
+    server.start(config.server.ip, config.server.port)
 
-            # continue until a client connects
-            if event != "connected" and not client_connected:
-                plotter.draw()
-                continue
+    # plots, or a text summary without importing matplotlib
+    if headless:
+        plotter = Summary(config, latency, server, config.plot.summary)
+    else:
+        from src import Plotter
+        plotter = Plotter(config)
+
+    # sessions, one per source in multi-client mode. the first connected one
+    # is plotted and its force prediction is sent to the client. unless the
+    # models are shared, a new sensor takes a set built ahead of its connection
+    shared_models = create_models(config) if multi_client and config.model.shared else None
+    pool = ModelPool(config) if multi_client and shared_models is None else None
+
+    # a replayed sensor connects as soon as it starts
+    if pool is not None and replay_path is not None:
+        pool.wait()
+
+    checkpoints = CheckpointStore(config.checkpoint.path) if config.checkpoint.enabled else None
+    sessions: dict[str | None, Session] = {}
+    primary = None
+
+    if not multi_client:
+        sessions[None] = Session(config, latency=latency, checkpoints=checkpoints)
+
+    # client, fed by its own thread
+    client = None
+    control_thread = None
+    if config.client.control:
+        client = Client(config.client.ip, config.client.port, config.client.protocol, latency)
+        control_thread = ControlThread(client, latest, config.model.features, config.model.targets, config.client.rate)
+        control_thread.start()
+
+    # events run at their own rate, but the samples of a source are ordered
+    # against its events: a sample of an unknown source waits for the
+    # "connected" event, and a disconnection waits for the queued samples
+    handling = False
+    deferred = []
+
+    # the reports of a session are printed when it disconnects, and the
+    # counters restart for the next one
+    reported = False
+
+    def handle_events() -> None:
+        nonlocal primary, handling, reported
+
+        handling = True
+        while (event := get(event_queue)) is not None:
+            event, source = event if multi_client else (event, None)
 
             # client has just connected
-            if event == "connected" and not client_connected:
-                client_connected = True
+            if event == "connected":
+                session = sessions.get(source)
+                if session is None:
+                    models = pool.take() if pool is not None else shared_models
+                    session = Session(config, source, models, latency, checkpoints)
+                    sessions[source] = session
 
-                trained_until = 0
-                predicted_until = 0
+                if session.connected:
+                    continue
 
-                learning_time_exceeded = False
-                start_time = time.time()
+                session.connect()
 
-                data.clear()
-                plotter.clear()
+                if primary is None:
+                    primary = session
+                    plotter.clear()
 
             # client has just disconnected
-            if event == "disconnected" and client_connected:
-                client_connected = False
-
-                data.save()
-                plotter.save()
-
-                if model is not None:
-                    model.close()
-
-                if fx_model is not None:
-                    fx_model.close()
-
-                if fy_model is not None:
-                    fy_model.close()
-
-                if fz_model is not None:
-                    fz_model.close()
-
-                continue
-
-            # while client is connected
-            while not data_queue.empty():
-                data.update(data_queue.get())
+            if event == "disconnected" and sessions.get(source) is not None and sessions[source].connected:
+                ingest()
+
+                session = sessions[source]
+                session.disconnect()
+
+                if session is primary:
+                    plotter.save()
+                    if control_thread is not None:
+                        control_thread.pause()
+                        control_thread.report()
+                        control_thread.reset()
+                    latency.report()
+                    latency.reset()
+                    scheduler.report()
+                    scheduler.reset()
+                    reported = True
+                    primary = next((s for s in sessions.values() if s.connected), None)
+
+        handling = False
+
+    def ingest() -> None:
+        # samples that arrived while a disconnection drained the queue
+        pending = deferred[:] if not handling else []
+        if pending:
+            deferred.clear()
+
+        while (item := pending.pop(0) if pending else get(data_queue)) is not None:
+            source, data = item if multi_client else (None, item)
+
+            session = sessions.get(source)
+            if session is None or not session.connected:
+                if handling:
+                    deferred.append(item)
+                    continue
+
+                handle_events()
+                session = sessions.get(source)
+
+            if session is not None and session.connected:
+                session.update(data)
+
+    def predict() -> None:
+        for session in sessions.values():
+            if session.connected:
+                session.predict()
+
+    def control() -> None:
+        if control_thread is None or primary is None:
+            return
+
+        # training stopped, the control thread sends the force data. a drift
+        # brings the session back to learning and stops it again
+        if not primary.learning():
+            control_thread.follow(primary.source, primary.models)
+        else:
+            control_thread.pause()
+
+    def train() -> None:
+        for session in sessions.values():
+            if session.connected and session.learning():
+                session.train()
+
+    def plot() -> None:
+        # keep the window responsive until a client connects
+        if primary is None:
+            plotter.draw()
+            return
+
+        plotter.update(primary.data)
+
+    # stages in priority order, each one at its own rate
+    scheduler = Scheduler()
+    scheduler.add("events", config.scheduler.events, handle_events)
+    scheduler.add("ingest", config.scheduler.ingest, ingest)
+    scheduler.add("predict", config.scheduler.predict, predict)
+    scheduler.add("control", config.scheduler.control, control)
+    scheduler.add("train", config.scheduler.train, train)
+    scheduler.add("plot", config.scheduler.plot, plot, deferrable=True)
+
+    # recorded session fed to the server instead of the sensor. it starts
+    # once every consumer is built, so the samples do not wait for the
+    # models to be traced or the training processes to be spawned
+    replay = None
+    if replay_path is not None:
+        deadline = time.monotonic() + 1.0
+        while not server.running and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        replay = Replay(replay_path, speed, "json" if config.server.protocol == "json" else "binary", config.plot.dt)
+        replay.start(*server.address)
 
-            data_len = len(data)
-
-            # update plot with prediction
-            input_data = np.array([
-                data["s0"][predicted_until:] / 100,
-                data["s1"][predicted_until:] / 100,
-                data["s2"][predicted_until:] / 100,
-                data["s3"][predicted_until:] / 100,
-            ]).T
-
-            fx_pred = np.array([])
-            fy_pred = np.array([])
-            fz_pred = np.array([])
-
-            if model is not None:
-                f_pred = model.predict(input_data).T
-                fx_pred = f_pred[0]
-                fy_pred = f_pred[1]
-                fz_pred = f_pred[2]
-
-            if fx_model is not None:
-                fx_pred = fx_model.predict(input_data)
-
-            if fy_model is not None:
-                fy_pred = fy_model.predict(input_data)
-
-            if fz_model is not None:
-                fz_pred = fz_model.predict(input_data)
-
-            if fx_pred.ndim > 0 and len(fx_pred) > 0:
-                data.update_numpy({
-                    "fx_pred": fx_pred,
-                    "fy_pred": fy_pred,
-                    "fz_pred": fz_pred,
-                })
-
-            predicted_until = data_len
-            plotter.update(data)
-
-            # training stopped
-            if time.time()-start_time > config.model.learning_time:
-                # switch to hard inference
-                if not learning_time_exceeded:
-                    print(
-                        f"{ansi.BOLD}{ansi.YELLOW}-> learning time exceeded{ansi.RESET}",
-                        "   |> switching to hard inference",
-                        "   |> sending force data to server" if config.client.control else "",
-                        sep="\n",
-                        end="\n\n",
-                    )
-
-                    if model is not None:
-                        model.close()
-
-                    if fx_model is not None:
-                        fx_model.close()
-
-                    if fy_model is not None:
-                        fy_model.close()
-
-                    if fz_model is not None:
-                        fz_model.close()
-
-                    learning_time_exceeded = True
-
-                # send force data to server
-                client.send_data({
-                    "fx": data["fx_pred"][-1],
-                    "fy": data["fy_pred"][-1],
-                    "fz": data["fz_pred"][-1],
-                    # "fx": data["fx"][-1],
-                    # "fy": data["fy"][-1],
-                    # "fz": data["fz"][-1],
-                }) if client is not None else None
-
-                continue
-
-            # training
-            if data_len - trained_until < config.model.required_samples:
-                continue
-
-            if model is not None:
-                train_model(model, trained_until, data_len, config.model.max_samples, data, ["fx", "fy", "fz"])
-
-            if fx_model is not None:
-                train_model(fx_model, trained_until, data_len, config.model.max_samples, data, "fx")
-
-            if fy_model is not None:
-                train_model(fy_model, trained_until, data_len, config.model.max_samples, data, "fy")
+    while True:
+        try:
+            scheduler.tick()
 
-            if fz_model is not None:
-                train_model(fz_model, trained_until, data_len, config.model.max_samples, data, "fz")
+            # the replay is over once its session is closed
+            if replay is not None and replay.finished() and primary is None:
+                break
 
         except KeyboardInterrupt:
             print(
@@ -242,20 +258,52 @@ def main(config_path: str) -> None:
 
             break
 
+    if replay is not None:
+        replay.stop()
+        print(
+            f"{ansi.BOLD}{ansi.BLUE}-> replay throughput{ansi.RESET}",
+            f"   |> sent: {replay.throughput():.0f} samples/s",
+            *[f"   |> ingested: {s.throughput():.0f} samples/s ({s.received} samples)" for s in sessions.values()],
+            sep="\n",
+            end="\n\n",
+        )
+
     server.stop()
     plotter.close()
 
-    if model is not None:
-        model.close()
-
-    if fx_model is not None:
-        fx_model.close()
-
-    if fy_model is not None:
-        fy_model.close()
-
-    if fz_model is not None:
-        fz_model.close()
+    # only what the last reports did not cover
+    unreported = primary is not None or not reported
+    if unreported:
+        latency.report()
+        scheduler.report()
+
+    if isinstance(data_queue, RingBuffer):
+        print(
+            f"{ansi.BOLD}{ansi.BLUE}-> ring buffer{ansi.RESET}",
+            f"   |> high-water mark: {data_queue.high_water_mark}/{data_queue.capacity}",
+            f"   |> dropped: {data_queue.dropped}",
+            sep="\n",
+            end="\n\n",
+        )
+
+    # sessions still recording are saved
+    for session in sessions.values():
+        if session.connected:
+            session.disconnect()
+        else:
+            session.close()
+
+    if pool is not None:
+        pool.close()
+
+    # pending checkpoints are written before exiting
+    if checkpoints is not None:
+        checkpoints.close()
+
+    if control_thread is not None:
+        control_thread.stop()
+        if unreported:
+            control_thread.report()
 
     if client is not None:
         client.close()
@@ -264,6 +312,10 @@ def main(config_path: str) -> None:
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", type=str)
+    parser.add_argument("--replay", type=str, default=None, help="recorded session to replay instead of the sensor")
+    parser.add_argument("--speed", type=str, default="1", help="replay speed factor, or max")
+    parser.add_argument("--headless", action="store_true", help="print a periodic summary instead of plotting")
+    parser.add_argument("--object", type=str, default=None, help="object the checkpoints are saved for")
     args = parser.parse_args()
 
-    main(args.config)
+    main(args.config, args.replay, 0.0 if args.speed == "max" else float(args.speed), args.headless, args.object)
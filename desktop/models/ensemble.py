@@ -0,0 +1,97 @@
+from copy import deepcopy
+
+import torch
+import torch.nn.functional as F
+from torch import Tensor
+from torch.nn import Module, Parameter, Linear, LayerNorm
+
+
+class StackedLinear(Module):
+    def __init__(self, layers: list[Linear]) -> None:
+        """
+        linear layers of several members as one batched matmul
+
+        x: [n_members, n_samples, in_features] -> [n_members, n_samples, out_features]
+        """
+        super().__init__()
+
+        self.weight = Parameter(torch.stack([layer.weight.detach().T for layer in layers]))
+        self.bias = Parameter(torch.stack([layer.bias.detach() for layer in layers]).unsqueeze(1))
+
+    def forward(self, x: Tensor) -> Tensor:
+        return torch.baddbmm(self.bias, x, self.weight)
+
+
+class StackedLayerNorm(Module):
+    def __init__(self, layers: list[LayerNorm]) -> None:
+        """
+        layer norms of several members, with one affine transform per member
+        """
+        super().__init__()
+
+        self.normalized_shape = layers[0].normalized_shape
+        self.eps = layers[0].eps
+        self.weight = Parameter(torch.stack([layer.weight.detach() for layer in layers]).unsqueeze(1))
+        self.bias = Parameter(torch.stack([layer.bias.detach() for layer in layers]).unsqueeze(1))
+
+    def forward(self, x: Tensor) -> Tensor:
+        return F.layer_norm(x, self.normalized_shape, eps=self.eps) * self.weight + self.bias
+
+
+def _stack(members: list[Module]) -> Module:
+    first = members[0]
+
+    if isinstance(first, Linear):
+        return StackedLinear(members)  # type: ignore
+
+    if isinstance(first, LayerNorm):
+        return StackedLayerNorm(members)  # type: ignore
+
+    if any(True for _ in first.parameters(recurse=False)) or any(True for _ in first.buffers(recurse=False)):
+        raise ValueError(f"Layer not supported by the ensemble: {type(first).__name__}")
+
+    # containers keep their forward, with every child stacked
+    module = deepcopy(first)
+    for name, _ in first.named_children():
+        setattr(module, name, _stack([getattr(m, name) for m in members]))
+
+    return module
+
+
+class EnsembleRegressor(Module):
+    def __init__(self, models: list[Module]) -> None:
+        """
+        independent single-output regressors stacked into one module
+
+        the weights of every layer are stacked along a new first dimension and
+        the input is broadcast over it, so one forward and one backward pass
+        serve every member while each member keeps its own weights. members
+        are made of linear and layer norm layers plus parameter-free ones
+
+        arguments
+        ---------
+        models: list[Module]
+            members with the same architecture and one output each. the
+            prediction has one column per member, in order
+        """
+        super().__init__()
+
+        self.n_members = len(models)
+        self.n_heads = getattr(models[0], "n_heads", 1)
+        self.net = _stack(models)
+
+    def forward(self, x: Tensor) -> Tensor:
+        # [n_samples, n_features] -> [n_members, n_samples, n_features]
+        x = x.unsqueeze(0).expand(self.n_members, *x.shape)
+
+        return self.net(x).reshape(self.n_members, -1).T
+
+    def forward_heads(self, x: Tensor) -> Tensor:
+        """
+        members with several heads, [n_samples, n_features] ->
+        [n_samples, n_heads, n_members]
+        """
+        x = x.unsqueeze(0).expand(self.n_members, *x.shape)
+
+        # [n_members, n_samples, n_heads, 1]
+        return self.net.forward_heads(x).squeeze(-1).permute(1, 2, 0)
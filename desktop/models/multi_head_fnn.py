@@ -1,4 +1,3 @@
-import torch
 from torch import Tensor
 from torch.nn import (
     Module,
@@ -11,7 +10,7 @@ from torch.nn import (
     LayerNorm,
     Dropout,
     BatchNorm1d,
-    ModuleDict,
+    Identity,
 )
 
 
@@ -35,12 +34,17 @@ class MultiHeadFeedforwardRegressor(Module):
                  n_outputs: int,
                  dropout: float,
                  hidden_dims: list[int] = [],
+                 n_heads: int = 4,
                  use_layer_norm: bool = True,
                  use_batch_norm: bool = False,
                  activation: str = 'relu',
                  ) -> None:
         """
-        feedforward regressor
+        feedforward regressor with several output heads on a shared body
+
+        the heads are fused into a single linear layer, so a forward pass
+        costs the same as a plain feedforward regressor. the prediction is the
+        mean of the heads and their spread is a cheap uncertainty estimate
 
         arguments
         ---------
@@ -52,6 +56,8 @@ class MultiHeadFeedforwardRegressor(Module):
             dropout rate
         hidden_dims: list[int]
             hidden layer dimensions
+        n_heads: int
+            number of output heads
         use_layer_norm: bool
             use layer normalization
         use_batch_norm: bool
@@ -61,11 +67,15 @@ class MultiHeadFeedforwardRegressor(Module):
         """
         super().__init__()
 
+        self.n_outputs = n_outputs
+        self.n_heads = n_heads
+
         layers: list[Module] = []
 
         # no hidden layers
         if not hidden_dims:
-            self.net = Sequential(Linear(n_inputs, 1))
+            self.net = Identity()
+            self.heads = Linear(n_inputs, n_heads * n_outputs)
             return
 
         # hidden layers
@@ -92,20 +102,29 @@ class MultiHeadFeedforwardRegressor(Module):
 
         # layers.append(Linear(hidden_dims[-1], n_outputs))
 
-        # module dict with multihead
-        self.heads = ModuleDict({
-            f'head_{i}': Sequential(
-                Linear(hidden_dims[-1], n_outputs),
-            )
-            for i in range(4)
-        })
+        # every head, fused
+        self.heads = Linear(hidden_dims[-1], n_heads * n_outputs)
+
+        self.net: Module = Sequential(*layers)
 
-        self.net: Sequential = Sequential(*layers)
+    def forward_heads(self, x: Tensor) -> Tensor:
+        """
+        [..., n_inputs] -> [..., n_heads, n_outputs]
+        """
+        x = self.heads(self.net(x))
+
+        return x.reshape(*x.shape[:-1], self.n_heads, self.n_outputs)
 
     def forward(self, x: Tensor, head: int = -1) -> Tensor:
-        x = self.net(x)
+        heads = self.forward_heads(x)
 
         if head == -1:
-            return torch.stack([head(x) for head in self.heads.values()]).mean(dim=0)
+            return heads.mean(dim=-2)
+
+        return heads[..., head, :]
 
-        return self.heads[f'head_{head}'](x).squeeze()
+    def spread(self, x: Tensor) -> Tensor:
+        """
+        standard deviation of the heads, [..., n_outputs]
+        """
+        return self.forward_heads(x).std(dim=-2)
@@ -0,0 +1,99 @@
+import math
+
+import numpy as np
+import torch
+from torch import Tensor
+from torch.nn import Module
+
+
+class RLSRegressor(Module):
+    def __init__(self, *,
+                 n_inputs: int,
+                 n_outputs: int,
+                 n_random_features: int = 0,
+                 lengthscale: float = 1.0,
+                 forgetting: float = 0.999,
+                 delta: float = 100.0,
+                 ) -> None:
+        """
+        linear regressor fitted by recursive least squares
+
+        every sample updates the weights in closed form, in O(d^2) with d the
+        number of features, so there are no epochs and no optimizer. with
+        random fourier features, the inputs are mapped to an approximation of
+        an rbf kernel and the regressor is a kernel rls
+
+        arguments
+        ---------
+        n_inputs: int
+            number of input features
+        n_outputs: int
+            number of output features
+        n_random_features: int
+            random fourier features of the inputs. 0 regresses on the inputs
+        lengthscale: float
+            lengthscale of the approximated rbf kernel
+        forgetting: float
+            weight of the past samples after every update, 1 never forgets
+        delta: float
+            initial covariance of the weights, larger values fit faster
+        """
+        super().__init__()
+
+        self.n_outputs = n_outputs
+        self.n_random_features = n_random_features
+        self.forgetting = forgetting
+
+        # the bias is the last feature
+        d = (n_random_features or n_inputs) + 1
+
+        self.register_buffer("omega", torch.randn(n_inputs, n_random_features) / lengthscale)
+        self.register_buffer("phase", torch.rand(n_random_features) * 2 * math.pi)
+        self.register_buffer("weight", torch.zeros(d, n_outputs))
+        self.register_buffer("p", torch.eye(d) * delta)
+        self.register_buffer("n_updates", torch.tensor(0.0))
+
+    def features(self, x: Tensor) -> Tensor:
+        """
+        [n_samples, n_inputs] -> [n_samples, d]
+        """
+        if self.n_random_features:
+            x = math.sqrt(2 / self.n_random_features) * torch.cos(x @ self.omega + self.phase)
+
+        return torch.cat([x, torch.ones_like(x[:, :1])], dim=1)
+
+    def forward(self, x: Tensor) -> Tensor:
+        y = self.features(x) @ self.weight
+
+        return y[:, 0] if self.n_outputs == 1 else y
+
+    @torch.no_grad()
+    def update(self, x: Tensor, y: Tensor) -> None:
+        """
+        one rls step per sample, in order
+
+        x: [n_samples, n_inputs]
+        y: [n_samples] or [n_samples, n_outputs]
+        """
+        phis = self.features(x.float()).numpy().astype(np.float64)
+        ys = y.reshape(len(y), -1).numpy().astype(np.float64)
+
+        # float64 copies, written back once
+        weight = self.weight.numpy().astype(np.float64)
+        p = self.p.numpy().astype(np.float64)
+        lam = self.forgetting
+
+        for phi, target in zip(phis, ys):
+            p_phi = p @ phi
+            gain = p_phi / (lam + phi @ p_phi)
+
+            weight += np.outer(gain, target - phi @ weight)
+            p -= np.outer(gain, p_phi)
+            p /= lam
+
+        # rounding errors break the symmetry of the covariance
+        p = (p + p.T) / 2
+
+        self.weight.copy_(torch.from_numpy(weight))
+        self.p.copy_(torch.from_numpy(p))
+        self.n_updates += len(phis)
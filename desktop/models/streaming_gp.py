@@ -0,0 +1,145 @@
+import torch
+from torch import Tensor
+
+from catasta.models import GPRegressor
+
+
+class StreamingGPRegressor(GPRegressor):
+    def __init__(self, *,
+                 n_inducing_points: int,
+                 n_inputs: int,
+                 n_outputs: int,
+                 kernel: str = "rq",
+                 mean: str = "constant",
+                 ) -> None:
+        """
+        sparse variational gp trained on a stream of samples
+
+        the inducing points are placed on the first samples and, with the
+        variational distribution, carried over from round to round, so every
+        round refines the previous posterior instead of fitting a new one. the
+        kl term of the elbo is weighted by every sample seen so far rather than
+        by the size of the round
+
+        the predictive terms that only depend on the weights are computed once
+        by `cache`, after new weights are written, so a prediction is the
+        kernel against the inducing points and a small matmul
+
+        arguments
+        ---------
+        n_inducing_points: int
+            number of inducing points
+        n_inputs: int
+            number of input features
+        n_outputs: int
+            number of independent outputs
+        kernel: str
+            options: rq, matern, rbf, rff, periodic, linear
+        mean: str
+            options: constant, zero
+        """
+        super().__init__(
+            n_inducing_points=n_inducing_points,
+            n_inputs=n_inputs,
+            n_outputs=n_outputs,
+            kernel=kernel,
+            mean=mean,
+        )
+
+        self.n_outputs = n_outputs
+
+        # saved with the weights
+        self.register_buffer("n_data", torch.tensor(0.0))
+        self.register_buffer("initialized", torch.tensor(0.0))
+
+        self.cached_terms: tuple[Tensor, Tensor, Tensor, float] | None = None
+
+    @property
+    def base_strategy(self):
+        # batched over the outputs when there are several
+        return getattr(self.variational_strategy, "base_variational_strategy", self.variational_strategy)
+
+    @torch.no_grad()
+    def observe(self, x: Tensor, n_data: int) -> bool:
+        """
+        records the samples seen so far, and places the inducing points on a
+        random subset of the first round. returns True when they were placed
+
+        x: [n_samples, n_inputs]
+        """
+        self.n_data.fill_(max(n_data, len(x), int(self.n_data)))
+        if self.initialized:
+            return False
+
+        points = self.base_strategy.inducing_points
+        n_points = points.shape[-2]
+
+        # every point on a distinct sample if there are enough of them
+        indices = torch.randperm(len(x))[:n_points]
+        if len(indices) < n_points:
+            indices = torch.cat([indices, torch.randint(len(x), (n_points - len(indices),))])
+
+        chosen = x[indices] + 1e-3 * torch.randn(n_points, x.shape[-1])
+        points.copy_(chosen.expand_as(points))
+        self.initialized.fill_(1.0)
+
+        return True
+
+    def _inputs(self, x: Tensor) -> Tensor:
+        # [n, n_inputs] -> [n_outputs, n, n_inputs] for the batched kernels
+        return x if self.n_outputs == 1 else x.unsqueeze(0).expand(self.n_outputs, *x.shape)
+
+    @torch.no_grad()
+    def cache(self) -> None:
+        """
+        whitened predictive terms of the current weights
+
+        mean: k(x, z) L^-T m
+        variance: k(x, x) + k(x, z) L^-T (S - I) L^-1 k(z, x)
+
+        with L the cholesky factor of k(z, z), and m, S the variational mean
+        and covariance
+        """
+        strategy = self.base_strategy
+        points = strategy.inducing_points
+        distribution = strategy._variational_distribution
+
+        k_zz = self.covar_module(points).to_dense().double()
+        eye = torch.eye(k_zz.shape[-1], dtype=torch.float64)
+        chol = torch.linalg.cholesky(k_zz + strategy.jitter_val * eye)
+        chol_inv = torch.linalg.solve_triangular(chol, eye.expand_as(chol), upper=False)
+
+        m = distribution.variational_mean.double().unsqueeze(-1)
+        s_root = distribution.chol_variational_covar.double().tril()
+        middle = s_root @ s_root.mT - eye
+
+        weights = (chol_inv.mT @ m).squeeze(-1)
+        covariance = chol_inv.mT @ middle @ chol_inv
+
+        self.cached_terms = (points.detach().clone(), weights.float(), covariance.float(), strategy.jitter_val)
+
+    def predict_cached(self, x: Tensor, variance: bool = False) -> Tensor | tuple[Tensor, Tensor]:
+        """
+        predictive mean, and variance with the observation noise, from the
+        cached terms. [n] for one output, [n, n_outputs] otherwise
+        """
+        if self.cached_terms is None:
+            self.cache()
+        points, weights, covariance, jitter = self.cached_terms  # type: ignore
+
+        # the forward of the kernel skips the lazy evaluation of gpytorch
+        x = self._inputs(x)
+        k_xz = self.covar_module.forward(x, points)
+
+        mean = self.mean_module(x) + (k_xz @ weights.unsqueeze(-1)).squeeze(-1)
+        if not variance:
+            return mean if self.n_outputs == 1 else mean.T
+
+        noise = self.likelihood.noise
+        if self.n_outputs > 1:
+            noise = (noise + self.likelihood.task_noises).unsqueeze(-1)
+
+        k_xx = self.covar_module.forward(x, x, diag=True) + jitter
+        var = k_xx + ((k_xz @ covariance) * k_xz).sum(dim=-1) + noise
+
+        return (mean, var) if self.n_outputs == 1 else (mean.T, var.T)
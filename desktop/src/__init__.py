@@ -1,6 +1,23 @@
 from .client import Client
 from .server import Server
-from .plotter import Plotter
+from .async_server import AsyncServer
 from .config import load_config
 from .data import Data
+from .ring import RingBuffer, Latest
+from .latency import LatencyMonitor, LatencyHistogram, LatencySummary
 from .model import Model
+from .session import Session, ModelPool, create_models
+from .replay import Replay
+from .scheduler import Scheduler
+from .control import ControlThread
+from .summary import Summary
+from .checkpoint import CheckpointStore
+
+
+def __getattr__(name: str):
+    # matplotlib is only imported when plotting
+    if name == "Plotter":
+        from .plotter import Plotter
+        return Plotter
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import torch
+
+from .config import ModelConfig
+
+
+# model settings that make checkpoints incompatible
+KEY_FIELDS = ("targets", "features", "model", "single_model", "ensemble", "hyperparameters")
+
+MODES = ("warm", "skip")
+
+
+class CheckpointStore:
+    def __init__(self, path: str) -> None:
+        """
+        model checkpoints on disk, keyed by object, sensor and model settings
+
+        saves and loads run on a background thread, in submission order, so a
+        connect never waits for the disk
+
+        arguments
+        ---------
+        path: str
+            directory of the checkpoint files
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def key(self, config: ModelConfig, object: str, sensor: str) -> str:
+        settings = {k: v for k, v in config._asdict().items() if k in KEY_FIELDS}
+        digest = hashlib.sha1(json.dumps([settings, object, sensor], sort_keys=True).encode()).hexdigest()
+
+        return f"{object}_{digest[:12]}"
+
+    def file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.pt")
+
+    def _save(self, key: str, states: list[dict]) -> None:
+        # written aside and renamed, a crash never leaves half a checkpoint
+        tmp = self.file(key) + ".tmp"
+        torch.save({"version": 1, "models": states}, tmp)
+        os.replace(tmp, self.file(key))
+
+    def _load(self, key: str) -> list[dict] | None:
+        if not os.path.exists(self.file(key)):
+            return None
+
+        return torch.load(self.file(key), weights_only=False)["models"]
+
+    def save(self, key: str, states: list[dict]) -> Future:
+        """
+        states: one `Model.checkpoint()` per model, not modified afterwards
+        """
+        return self.executor.submit(self._save, key, states)
+
+    def load(self, key: str) -> Future:
+        """
+        future of the saved states, None if there is no checkpoint
+        """
+        return self.executor.submit(self._load, key)
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
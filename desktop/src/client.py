@@ -1,19 +1,72 @@
 import socket
 import json
+import time
+
+from .latency import LatencyMonitor
+from .protocol import Encoder
 
 
 class Client:
-    def __init__(self, server_host: str, server_port: int) -> None:
+    def __init__(self,
+                 server_host: str,
+                 server_port: int,
+                 protocol: str = "json",
+                 latency: LatencyMonitor | None = None,
+                 ) -> None:
+        """
+        udp client that sends the predictions to the robot
+
+        arguments
+        ---------
+        protocol: str
+            json or binary
+        latency: LatencyMonitor | None
+            monitor shared with the rest of the pipeline. the client records the
+            time from the sample receipt to the emission in the "send" stage
+        """
         self.server_host = server_host
         self.server_port = server_port
+        self.protocol = protocol
+        self.latency = latency if latency is not None else LatencyMonitor()
+        self.encoder = None
+        self.seq = 0
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
-    def send_data(self, data: dict) -> None:
+    def _encode(self, data: dict) -> list[bytes]:
+        if self.protocol == "json":
+            # sequence number and timestamp (ms) for loss tracking on the receiver
+            data = {**data, "seq": self.seq, "timestamp": time.time() * 1000}
+            self.seq += 1
+
+            return [json.dumps(data).encode('utf-8')]
+
+        # the channel layout is fixed by the first sample
+        if self.encoder is None:
+            self.encoder = Encoder(list(data.keys()))
+
+        packets = [self.encoder.encode_schema()] if self.encoder.needs_schema() else []
+        packets.append(self.encoder.encode(data))
+
+        return packets
+
+    def send_data(self, data: dict, recv_ns: int | None = None) -> None:
+        """
+        recv_ns: receive time (time.monotonic_ns()) of the sample the data was
+        computed from. its age is sent along in the "age_ns" channel
+        """
+        if recv_ns is not None:
+            age = time.monotonic_ns() - recv_ns
+            data = {**data, "age_ns": age}
+
         try:
-            json_data = json.dumps(data)
-            self.socket.sendto(json_data.encode('utf-8'), (self.server_host, self.server_port))
+            for packet in self._encode(data):
+                self.socket.sendto(packet, (self.server_host, self.server_port))
         except Exception as e:
             print(f"Error sending data: {e}")
+            return
+
+        if recv_ns is not None:
+            self.latency.record("send", age)
 
     def close(self) -> None:
         self.socket.close()
@@ -9,6 +9,15 @@ class ServerConfig(NamedTuple):
     ip: str
     port: int
     timeout: float
+    backend: str
+    protocol: str
+    batch: bool
+    rcvbuf: int
+    fill_gaps: bool
+    multi_client: bool
+    buffer: str
+    ring_size: int
+    ring_policy: str
 
 
 # ======
@@ -18,6 +27,8 @@ class ClientConfig(NamedTuple):
     ip: str
     port: int
     control: bool
+    protocol: str
+    rate: float
 
 
 # ====
@@ -27,6 +38,9 @@ class DataConfig(NamedTuple):
     save: bool
     path: str
     date_format: str
+    format: str
+    chunk_size: int
+    window: int
 
 
 # ======
@@ -47,16 +61,65 @@ class ModelConfig(NamedTuple):
     features: list[str]
     required_samples: int
     max_samples: int
+    buffer: str
+    buffer_size: int
+    buffer_bins: int
     epochs: int
     batch_size: int
+    batching: str
     lr: float
+    lr_decay: float
     learning_time: int
     model: str
     single_model: bool
+    ensemble: bool
+    shared: bool
+    backend: str
     tau: float
+    inference: str
+    inference_threads: int
     hyperparameters: dict
 
 
+# ==========
+# CHECKPOINT
+# ==========
+class CheckpointConfig(NamedTuple):
+    enabled: bool
+    path: str
+    object: str
+    sensor: str
+    mode: str
+
+
+# ========
+# LEARNING
+# ========
+class LearningConfig(NamedTuple):
+    adaptive: bool
+    holdout: float
+    window: int
+    interval: float
+    min_samples: int
+    threshold: float
+    patience: int
+    min_delta: float
+    drift_delta: float
+    drift_threshold: float
+
+
+# =========
+# SCHEDULER
+# =========
+class SchedulerConfig(NamedTuple):
+    events: float
+    ingest: float
+    predict: float
+    control: float
+    train: float
+    plot: float
+
+
 # ====
 # PLOT
 # ====
@@ -73,6 +136,8 @@ class AxisConfig(NamedTuple):
 
 
 class PlotConfig(NamedTuple):
+    enabled: bool
+    summary: float
     layout: str
     time_window: int
     dt: float
@@ -91,6 +156,9 @@ class Config(NamedTuple):
     figure: FigureConfig
     plot: PlotConfig
     model: ModelConfig
+    checkpoint: CheckpointConfig
+    learning: LearningConfig
+    scheduler: SchedulerConfig
 
 
 def load_config(path: str) -> Config:
@@ -103,12 +171,24 @@ def load_config(path: str) -> Config:
         ip=config["server"]["ip"],
         port=config["server"]["port"],
         timeout=config["server"]["timeout"],
+        backend=config["server"]["backend"],
+        protocol=config["server"]["protocol"],
+        batch=config["server"]["batch"],
+        rcvbuf=config["server"]["rcvbuf"],
+        fill_gaps=config["server"]["fill_gaps"],
+        multi_client=config["server"]["multi_client"],
+        buffer=config["server"]["buffer"],
+        ring_size=config["server"]["ring_size"],
+        ring_policy=config["server"]["ring_policy"],
     )
 
     data = DataConfig(
         save=config["data"]["save"],
         path=config["data"]["path"],
         date_format=config["data"]["date_format"],
+        format=config["data"]["format"],
+        chunk_size=config["data"]["chunk_size"],
+        window=config["data"]["window"],
     )
 
     figure = FigureConfig(
@@ -120,6 +200,8 @@ def load_config(path: str) -> Config:
 
     # axes
     plot = PlotConfig(
+        enabled=config["plot"].pop("enabled"),
+        summary=config["plot"].pop("summary"),
         layout=config["plot"].pop("layout"),
         time_window=config["plot"].pop("time_window"),
         dt=config["plot"].pop("dt"),
@@ -144,13 +226,23 @@ def load_config(path: str) -> Config:
         features=config["model"]["features"],
         required_samples=config["model"]["required_samples"],
         max_samples=config["model"]["max_samples"],
+        buffer=config["model"]["buffer"],
+        buffer_size=config["model"]["buffer_size"],
+        buffer_bins=config["model"]["buffer_bins"],
         epochs=config["model"]["epochs"],
         batch_size=config["model"]["batch_size"],
+        batching=config["model"]["batching"],
         lr=config["model"]["lr"],
+        lr_decay=config["model"]["lr_decay"],
         learning_time=config["model"]["learning_time"],
         model=config["model"]["model"],
         single_model=config["model"]["single_model"],
+        ensemble=config["model"]["ensemble"],
+        shared=config["model"]["shared"],
+        backend=config["model"]["backend"],
         tau=config["model"]["tau"],
+        inference=config["model"]["inference"],
+        inference_threads=config["model"]["inference_threads"],
         hyperparameters=config["model"]["hyperparameters"],
     )
 
@@ -158,6 +250,38 @@ def load_config(path: str) -> Config:
         ip=config["client"]["ip"],
         port=config["client"]["port"],
         control=config["client"]["control"],
+        protocol=config["client"]["protocol"],
+        rate=config["client"]["rate"],
+    )
+
+    checkpoint = CheckpointConfig(
+        enabled=config["checkpoint"]["enabled"],
+        path=config["checkpoint"]["path"],
+        object=config["checkpoint"]["object"],
+        sensor=config["checkpoint"]["sensor"],
+        mode=config["checkpoint"]["mode"],
+    )
+
+    learning = LearningConfig(
+        adaptive=config["learning"]["adaptive"],
+        holdout=config["learning"]["holdout"],
+        window=config["learning"]["window"],
+        interval=config["learning"]["interval"],
+        min_samples=config["learning"]["min_samples"],
+        threshold=config["learning"]["threshold"],
+        patience=config["learning"]["patience"],
+        min_delta=config["learning"]["min_delta"],
+        drift_delta=config["learning"]["drift_delta"],
+        drift_threshold=config["learning"]["drift_threshold"],
+    )
+
+    scheduler = SchedulerConfig(
+        events=config["scheduler"]["events"],
+        ingest=config["scheduler"]["ingest"],
+        predict=config["scheduler"]["predict"],
+        control=config["scheduler"]["control"],
+        train=config["scheduler"]["train"],
+        plot=config["scheduler"]["plot"],
     )
 
     return Config(
@@ -167,4 +291,7 @@ def load_config(path: str) -> Config:
         plot=plot,
         model=model,
         client=client,
+        checkpoint=checkpoint,
+        learning=learning,
+        scheduler=scheduler,
     )
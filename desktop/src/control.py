@@ -0,0 +1,164 @@
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from . import ansi
+from .client import Client
+from .model import Model
+from .ring import Latest
+
+
+class ControlStats(NamedTuple):
+    rate: float  # Hz, target
+    actual_rate: float  # Hz
+    sent: int
+    stale: int
+    overruns: int
+
+
+class ControlThread:
+    def __init__(self,
+                 client: Client,
+                 latest: Latest,
+                 features: list[str],
+                 targets: list[str],
+                 rate: float,
+                 ) -> None:
+        """
+        predicts and sends the force on its own thread at a fixed rate
+
+        every tick takes the newest sensor sample straight from the server,
+        runs the inference models on it and sends the result. older samples
+        are skipped (latest value wins), and ticks without a new sample send
+        nothing. plotting, training and the main loop never block it
+
+        arguments
+        ---------
+        latest: Latest
+            mailbox the server puts the newest sample in
+        rate: float
+            send rate (Hz)
+        """
+        self.client = client
+        self.latest = latest
+        self.features = features
+        self.targets = targets
+        self.period = 1 / rate
+
+        # (source, models) swapped as a whole. None pauses the output
+        self.target: tuple[str | None, list[tuple[Model, str | list[str]]]] | None = None
+
+        self.sent = 0
+        self.stale = 0
+        self.overruns = 0
+        self.start_time = time.monotonic()
+
+        self.running = False
+        self.thread = None
+
+    def start(self) -> None:
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def follow(self, source: str | None, models: list[tuple[Model, str | list[str]]]) -> None:
+        """
+        sends the predictions of `models` for the samples of `source`. the
+        stats restart when the target changes
+        """
+        if self.target is not None and self.target[0] == source and self.target[1] is models:
+            return
+
+        self.target = (source, models)
+        self.reset()
+
+    def pause(self) -> None:
+        self.target = None
+
+    def _predict(self, sample: dict[str, float], models: list[tuple[Model, str | list[str]]]) -> dict[str, float] | None:
+        x = np.array([[sample.get(f, np.nan) / 100 for f in self.features]])
+        if not np.isfinite(x).all():
+            return None
+
+        f_send = {}
+        for model, target in models:
+            pred = np.asarray(model.predict(x), dtype=np.float64).reshape(-1)
+            if isinstance(target, str):
+                f_send[target] = float(pred[0])
+            else:
+                f_send.update(zip(target, pred.tolist()))
+
+        return f_send
+
+    def _step(self, last_version: int) -> int:
+        target = self.target
+        if target is None:
+            return last_version
+
+        version, sample = self.latest.get(target[0])
+        if sample is None or version == last_version:
+            self.stale += 1
+            return last_version
+
+        f_send = self._predict(sample, target[1])
+        if f_send is None or not np.isfinite([f_send[t] for t in self.targets]).all():
+            return version
+
+        recv_ns = sample.get("recv_ns", np.nan)
+        self.client.send_data({t: f_send[t] for t in self.targets}, int(recv_ns) if np.isfinite(recv_ns) else None)
+        self.sent += 1
+
+        return version
+
+    def _run(self) -> None:
+        version = 0
+        next_time = time.monotonic()
+
+        while self.running:
+            version = self._step(version)
+
+            next_time += self.period
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -self.period:
+                # a whole tick was missed, restart the schedule from now
+                self.overruns += 1
+                next_time = time.monotonic()
+
+    def stats(self) -> ControlStats:
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+
+        return ControlStats(
+            rate=1 / self.period,
+            actual_rate=self.sent / elapsed,
+            sent=self.sent,
+            stale=self.stale,
+            overruns=self.overruns,
+        )
+
+    def reset(self) -> None:
+        self.sent = self.stale = self.overruns = 0
+        self.start_time = time.monotonic()
+
+    def report(self) -> None:
+        s = self.stats()
+        if not s.sent:
+            return
+
+        print(
+            f"{ansi.BOLD}{ansi.BLUE}-> control output{ansi.RESET}",
+            f"   |> rate: {s.actual_rate:.1f}/{s.rate:.0f} Hz",
+            f"   |> sent: {s.sent}",
+            f"   |> ticks without a new sample: {s.stale}",
+            f"   |> overruns: {s.overruns}",
+            sep="\n",
+            end="\n\n",
+        )
+
+    def stop(self) -> None:
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
@@ -4,15 +4,118 @@ import pandas as pd
 import numpy as np
 
 from . import ansi
+from .recorder import Recorder
+
+
+class Column:
+    """
+    growable, preallocated float column
+
+    the buffer doubles its capacity when full, so appends are amortized O(1)
+    and reads return zero-copy views of the filled region. views are only
+    valid until the next append that triggers a reallocation or a trim.
+
+    `start` is the number of values dropped from the front by `trim`, so
+    `start + length` is the absolute length of the column
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.buffer = np.empty(capacity, dtype=np.float64)
+        self.length = 0
+        self.start = 0
+
+    def _reserve(self, n: int) -> None:
+        required = self.length + n
+        if required <= len(self.buffer):
+            return
+
+        capacity = len(self.buffer)
+        while capacity < required:
+            capacity *= 2
+
+        buffer = np.empty(capacity, dtype=np.float64)
+        buffer[:self.length] = self.buffer[:self.length]
+        self.buffer = buffer
+
+    def append(self, value: float) -> None:
+        self._reserve(1)
+        self.buffer[self.length] = value
+        self.length += 1
+
+    def extend(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        n = len(values)
+
+        self._reserve(n)
+        self.buffer[self.length:self.length+n] = values
+        self.length += n
+
+    def trim(self, keep: int) -> None:
+        """
+        keeps the last `keep` values
+        """
+        if self.length <= keep:
+            return
+
+        self.buffer[:keep] = self.buffer[self.length-keep:self.length]
+        self.start += self.length - keep
+        self.length = keep
+
+    def view(self) -> np.ndarray:
+        return self.buffer[:self.length]
+
+    def since(self, index: int) -> np.ndarray:
+        """
+        values from the absolute `index` on that are still kept
+        """
+        return self.buffer[max(index - self.start, 0):self.length]
+
+    def __len__(self) -> int:
+        return self.start + self.length
 
 
 class Data:
-    def __init__(self, path: str, save: bool, date_format: str) -> None:
-        self.data: dict[str, list[float]] = {}
+    def __init__(self,
+                 path: str,
+                 save: bool,
+                 date_format: str,
+                 capacity: int = 4096,
+                 tag: str = "",
+                 format: str = "csv",
+                 chunk_size: int = 1024,
+                 window: int = 0,
+                 ) -> None:
+        """
+        session data, one column per channel
+
+        arguments
+        ---------
+        format: str
+            csv: the whole session is written at `save`
+            columns: the session is streamed to disk while it is recorded and
+            `save` only closes the recording. see `recorder.py`
+        chunk_size: int
+            samples per written chunk of the columns format
+        window: int
+            samples kept in memory with the columns format. 0 keeps the whole
+            session. lengths and `since` keep counting absolute samples
+        """
+        if format not in ("csv", "columns"):
+            raise ValueError(f"Unknown data format: {format}")
+
+        self.data: dict[str, Column] = {}
+        self.capacity = capacity
+        self.tag = tag
         self.save_ = save
         self.date_format = date_format
         self.unkown_keys = set()
 
+        self.format = format
+        self.chunk_size = chunk_size
+        self.window = window if format == "columns" else 0
+        self.recorder: Recorder | None = None
+        self.filename = ""
+
         self.path = path
         if not os.path.exists(self.path) and self.save_:
             print(
@@ -24,27 +127,83 @@ class Data:
             )
             self.save_ = False
 
+    def _column(self, key: str) -> Column:
+        column = self.data.get(key)
+        if column is None:
+            column = Column(self.capacity)
+            self.data[key] = column
+
+        return column
+
+    def _name(self) -> str:
+        date = datetime.datetime.now().strftime(self.date_format)
+        name = f"{date}_{self.tag}" if self.tag else date
+
+        return os.path.join(self.path, name)
+
+    def sidecar(self, suffix: str) -> str:
+        """
+        path of a file saved next to the data, named after it
+        """
+        return f"{self.filename or self._name()}_{suffix}"
+
+    def _record(self, d: dict) -> None:
+        if self.format != "columns" or not self.save_:
+            return
+
+        # the recording starts with the first sample of the session
+        if self.recorder is None:
+            self.filename = self._name()
+            self.recorder = Recorder(self.filename, self.chunk_size)
+
+        self.recorder.append(d)
+
+    def _trim(self) -> None:
+        # amortized: the columns are trimmed once they are twice the window
+        if not self.window:
+            return
+
+        for column in self.data.values():
+            if column.length > 2 * self.window:
+                column.trim(self.window)
+
     def update(self, d: dict[str, float]) -> None:
         for k, v in d.items():
-            if k in self.data:
-                self.data[k].append(v)
-            else:
-                self.data[k] = [v]
+            self._column(k).append(v)
+
+        self._record(d)
+        self._trim()
 
     def update_numpy(self, d: dict[str, np.ndarray]) -> None:
         for k, v in d.items():
-            if k in self.data:
-                self.data[k].extend(v)
-            else:
-                self.data[k] = list(v)
+            self._column(k).extend(v)
+
+        self._record(d)
+        self._trim()
 
     def save(self) -> None:
         if not self.save_ or not self.data:
             return
 
-        date = datetime.datetime.now().strftime(self.date_format)
-        filename = os.path.join(self.path, f"{date}.csv")
-        pd.DataFrame(self.data).to_csv(filename, index=False)
+        if self.format == "columns":
+            if self.recorder is None:
+                return
+
+            # the writer thread finishes the last chunk on its own
+            samples = len(self.recorder)
+            self.recorder.close()
+            self.recorder = None
+
+            print(
+                f"{ansi.BOLD}{ansi.GREEN}-> data saved{ansi.RESET}\n",
+                f"   |> path: {self.filename}\n",
+                f"   |> samples: {samples}\n",
+                sep="",
+            )
+            return
+
+        filename = f"{self._name()}.csv"
+        pd.DataFrame({k: v.view() for k, v in self.data.items()}).to_csv(filename, index=False)
 
         print(
             f"{ansi.BOLD}{ansi.GREEN}-> data saved{ansi.RESET}\n",
@@ -53,29 +212,54 @@ class Data:
         )
 
     def clear(self) -> None:
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
         self.data.clear()
 
+    def since(self, key: str, index: int) -> np.ndarray:
+        """
+        read-only values of a column from the absolute sample `index` on
+        """
+        column = self.data.get(key)
+        if column is None:
+            return self[key]
+
+        values = column.since(index)
+        values.flags.writeable = False
+
+        return values
+
     def __getitem__(self, key: str) -> np.ndarray:
-        data = self.data.get(key, [])
-        if not data and key not in self.unkown_keys:
-            self.unkown_keys.add(key)
-            print(
-                f"{ansi.BOLD}{ansi.YELLOW}-> unknown key recieved{ansi.RESET}\n",
-                f"   |> name: {key}\n",
-                sep="",
-            )
+        """
+        returns a read-only view of the column, valid until the next update
+        """
+        column = self.data.get(key)
+        if column is None or not column.length:
+            if key not in self.unkown_keys:
+                self.unkown_keys.add(key)
+                print(
+                    f"{ansi.BOLD}{ansi.YELLOW}-> unknown key recieved{ansi.RESET}\n",
+                    f"   |> name: {key}\n",
+                    sep="",
+                )
 
-        return np.array(data)
+            return np.array([])
 
-    def __len__(self) -> int:
-        lengths = [len(v) for v in self.data.values()]
+        view = column.view()
+        view.flags.writeable = False
+
+        return view
 
-        # if not np.all(np.array(lengths) == lengths[0]):
-        #     print(
-        #         f"{ansi.BOLD}{ansi.YELLOW}-> data length mismatch{ansi.RESET}",
-        #     )
-        #     for k, v in self.data.items():
-        #         print(f"   |> {k}: {len(v)}")
-        #     print()
+    def __contains__(self, key: str) -> bool:
+        column = self.data.get(key)
+
+        return column is not None and column.length > 0
+
+    def __len__(self) -> int:
+        # absolute length of the first received channel
+        for column in self.data.values():
+            return len(column)
 
-        return lengths[0]
+        return 0
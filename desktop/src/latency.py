@@ -0,0 +1,154 @@
+import bisect
+from typing import NamedTuple
+
+import numpy as np
+
+from . import ansi
+
+
+class LatencySummary(NamedTuple):
+    count: int
+    mean: float  # ms
+    p50: float  # ms
+    p95: float  # ms
+    p99: float  # ms
+    max: float  # ms
+
+
+class LatencyHistogram:
+    def __init__(self, low: float = 1e3, high: float = 1e10, bins_per_decade: int = 40) -> None:
+        """
+        fixed-size histogram of latencies in ns with log-spaced bins
+
+        memory does not grow with the number of samples and percentiles are
+        accurate to the bin width, about 6% with 40 bins per decade. a single
+        thread is expected to record into it, any thread can read it
+
+        arguments
+        ---------
+        low: float
+            lower edge of the first bin (ns). smaller values are counted in an
+            underflow bin
+        high: float
+            upper edge of the last bin (ns). larger values are counted in an
+            overflow bin
+        bins_per_decade: int
+            resolution of the histogram
+        """
+        n_bins = int(round(np.log10(high / low) * bins_per_decade))
+        self.edges = np.logspace(np.log10(low), np.log10(high), n_bins + 1)
+        self.edges_list = self.edges.tolist()
+
+        # underflow, bins and overflow
+        self.counts = np.zeros(n_bins + 2, dtype=np.int64)
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts[:] = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def record(self, ns: float) -> None:
+        if ns != ns:
+            return
+
+        self.counts[bisect.bisect_right(self.edges_list, ns)] += 1
+        self.total += ns
+        self.min = min(self.min, ns)
+        self.max = max(self.max, ns)
+
+    def record_many(self, ns: np.ndarray) -> None:
+        ns = np.atleast_1d(np.asarray(ns, dtype=np.float64))
+        ns = ns[np.isfinite(ns)]
+        if not len(ns):
+            return
+
+        indices = np.searchsorted(self.edges, ns, side="right")
+        self.counts += np.bincount(indices, minlength=len(self.counts))
+        self.total += float(ns.sum())
+        self.min = min(self.min, float(ns.min()))
+        self.max = max(self.max, float(ns.max()))
+
+    def __len__(self) -> int:
+        return int(self.counts.sum())
+
+    def percentile(self, q: float) -> float:
+        """
+        q in [0, 100]. returns the geometric center of the bin holding the
+        percentile in ns, clipped to the recorded range
+        """
+        counts = self.counts.copy()
+        n = counts.sum()
+        if not n:
+            return np.nan
+
+        i = int(np.searchsorted(np.cumsum(counts), q / 100 * n, side="left"))
+        if i == 0:
+            return self.min
+        if i == len(counts) - 1:
+            return self.max
+
+        center = np.sqrt(self.edges[i - 1] * self.edges[i])
+
+        return float(np.clip(center, self.min, self.max))
+
+    def summary(self) -> LatencySummary:
+        n = len(self)
+        if not n:
+            return LatencySummary(0, np.nan, np.nan, np.nan, np.nan, np.nan)
+
+        return LatencySummary(
+            count=n,
+            mean=self.total / n / 1e6,
+            p50=self.percentile(50) / 1e6,
+            p95=self.percentile(95) / 1e6,
+            p99=self.percentile(99) / 1e6,
+            max=self.max / 1e6,
+        )
+
+
+class LatencyMonitor:
+    def __init__(self) -> None:
+        """
+        latency histograms of the pipeline, one per stage
+
+        stages are created on their first record and each one should only be
+        recorded from a single thread. summaries can be queried live
+        """
+        self.stages: dict[str, LatencyHistogram] = {}
+
+    def stage(self, name: str) -> LatencyHistogram:
+        histogram = self.stages.get(name)
+        if histogram is None:
+            histogram = self.stages.setdefault(name, LatencyHistogram())
+
+        return histogram
+
+    def record(self, stage: str, ns: float) -> None:
+        self.stage(stage).record(ns)
+
+    def record_many(self, stage: str, ns: np.ndarray) -> None:
+        self.stage(stage).record_many(ns)
+
+    def summary(self) -> dict[str, LatencySummary]:
+        return {name: histogram.summary() for name, histogram in list(self.stages.items())}
+
+    def reset(self) -> None:
+        for histogram in list(self.stages.values()):
+            histogram.reset()
+
+    def report(self) -> None:
+        lines = [
+            f"   |> {name}: p50 {s.p50:.2f} ms | p95 {s.p95:.2f} ms | p99 {s.p99:.2f} ms | max {s.max:.2f} ms ({s.count} samples)"
+            for name, s in self.summary().items() if s.count
+        ]
+        if not lines:
+            return
+
+        print(
+            f"{ansi.BOLD}{ansi.BLUE}-> latency{ansi.RESET}",
+            *lines,
+            sep="\n",
+            end="\n\n",
+        )
@@ -0,0 +1,186 @@
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from . import ansi
+from .config import LearningConfig
+
+
+class PageHinkley:
+    def __init__(self, delta: float, threshold: float) -> None:
+        """
+        page-hinkley test for an increase of the mean of a stream
+
+        arguments
+        ---------
+        delta: float
+            increase of the mean that is tolerated
+        threshold: float
+            cumulative increase that signals a drift
+        """
+        self.delta = delta
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self) -> None:
+        self.n = 0
+        self.mean = 0.0
+        self.cumulative = 0.0
+        self.minimum = 0.0
+
+    def update(self, value: float) -> bool:
+        """
+        returns True when the stream drifted upwards
+        """
+        self.n += 1
+        self.mean += (value - self.mean) / self.n
+        self.cumulative += value - self.mean - self.delta
+        self.minimum = min(self.minimum, self.cumulative)
+
+        return self.cumulative - self.minimum > self.threshold
+
+
+class LearningMonitor:
+    def __init__(self, config: LearningConfig, n_features: int, targets: list[str]) -> None:
+        """
+        rolling validation error of a session and the phase it implies
+
+        one sample out of every `1 / holdout` is held out from training, by its
+        absolute index, and the newest `window` of them are the validation
+        set. the learning phase ends when the error drops below the threshold
+        or stops improving, and a page-hinkley test on the error relative to
+        the converged one starts it again when the error grows
+
+        arguments
+        ---------
+        targets: list[str]
+            columns of the validation targets and of the predictions
+        """
+        self.config = config
+        self.targets = targets
+        self.every = max(2, round(1 / config.holdout))
+
+        self.x = np.empty((config.window, n_features), dtype=np.float32)
+        self.y = np.empty((config.window, len(targets)), dtype=np.float32)
+
+        self.drift = PageHinkley(config.drift_delta, config.drift_threshold)
+        self.reset()
+
+    def reset(self) -> None:
+        self.filled = 0
+        self.next = 0
+
+        self.learning = True
+        self.best = np.inf
+        self.stale = 0
+        self.reference: float | None = None
+        self.drift.reset()
+
+        # (time, error, error of every target, learning) of every evaluation
+        self.curve: list[tuple] = []
+        self.events: list[tuple[float, str, float]] = []
+
+    def held_out(self, start: int, n: int) -> np.ndarray:
+        """
+        mask of the validation samples among the absolute indices
+        [start, start + n)
+        """
+        return np.arange(start, start + n) % self.every == self.every - 1
+
+    def add(self, x: np.ndarray, y: np.ndarray) -> None:
+        """
+        x: [n_samples, n_features]
+        y: [n_samples, n_targets]
+        """
+        for row_x, row_y in zip(x[-self.config.window:], y[-self.config.window:]):
+            self.x[self.next] = row_x
+            self.y[self.next] = row_y
+            self.next = (self.next + 1) % self.config.window
+            self.filled = min(self.filled + 1, self.config.window)
+
+    def skip(self) -> None:
+        """
+        ends the learning phase before any evaluation. the first error is the
+        reference of the drift test
+        """
+        self.learning = False
+
+    def evaluate(self, t: float, predict: Callable[[np.ndarray], np.ndarray]) -> str | None:
+        """
+        validation error of `predict`, which maps [n, n_features] to
+        [n, n_targets]. returns the event it caused: "threshold" or "plateau"
+        when the learning phase ends, "drift" when it starts again
+        """
+        if self.filled < self.config.min_samples:
+            return None
+
+        errors = np.sqrt(np.mean((predict(self.x[:self.filled]) - self.y[:self.filled]) ** 2, axis=0))
+        error = float(errors.mean())
+        self.curve.append((t, error, *errors.tolist(), self.learning))
+
+        event = self._step(error)
+        if event is not None:
+            self.events.append((t, event, error))
+
+        return event
+
+    def _step(self, error: float) -> str | None:
+        if not self.learning:
+            if self.reference is None:
+                self.reference = error
+
+            # relative to the converged error, so the test does not depend on
+            # the force range
+            if not self.drift.update(error / max(self.reference, 1e-9)):
+                return None
+
+            self.learning = True
+            self.best = np.inf
+            self.stale = 0
+
+            return "drift"
+
+        if error < self.best * (1 - self.config.min_delta):
+            self.best = error
+            self.stale = 0
+        else:
+            self.stale += 1
+
+        if error <= self.config.threshold:
+            event = "threshold"
+        elif self.stale >= self.config.patience:
+            event = "plateau"
+        else:
+            return None
+
+        self.learning = False
+        self.reference = min(error, self.best)
+        self.drift.reset()
+
+        return event
+
+    @property
+    def error(self) -> float:
+        return self.curve[-1][1] if self.curve else np.nan
+
+    def report(self) -> None:
+        if not self.curve:
+            return
+
+        errors = [point[1] for point in self.curve]
+        print(
+            f"{ansi.BOLD}{ansi.BLUE}-> learning curve{ansi.RESET}",
+            f"   |> evaluations: {len(self.curve)} on {self.filled} held-out samples",
+            f"   |> error: first {errors[0]:.4f} | best {min(errors):.4f} | last {errors[-1]:.4f}",
+            *[f"   |> {t:.1f} s: {event} at {error:.4f}" for t, event, error in self.events],
+            sep="\n",
+            end="\n\n",
+        )
+
+    def save(self, path: str) -> None:
+        if not self.curve:
+            return
+
+        columns = ["time", "error", *[f"{t}_error" for t in self.targets], "learning"]
+        pd.DataFrame(self.curve, columns=columns).to_csv(path, index=False)
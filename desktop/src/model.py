@@ -1,6 +1,10 @@
+import multiprocessing as mp
+import signal
 import threading
 import time
+import weakref
 from copy import deepcopy
+from typing import Callable
 
 import numpy as np
 
@@ -9,19 +13,44 @@ from catasta.models import GPRegressor, FeedforwardRegressor, TransformerRegress
 import torch
 from torch.utils.data import DataLoader, TensorDataset
 from torch.optim import AdamW
+from torch.optim.lr_scheduler import ExponentialLR
 
 from gpytorch.mlls import VariationalELBO
 
 from .import ansi
 from .config import ModelConfig
+from .shared import SharedArray, WeightExchange
 from models.multi_head_fnn import MultiHeadFeedforwardRegressor
+from models.ensemble import EnsembleRegressor
+from models.streaming_gp import StreamingGPRegressor
+from models.rls import RLSRegressor
 
 
-def model_factory(config: ModelConfig):
+# models that can be stacked into an ensemble
+ENSEMBLE_MODELS = ("fnn", "multi_head_fnn")
+
+# models updated sample by sample at ingest, without training rounds
+ONLINE_MODELS = ("rls", "rff_rls")
+
+
+def is_ensemble(config: ModelConfig) -> bool:
+    """
+    per-target models stacked into a single one
+    """
+    return not config.single_model and config.ensemble and config.model in ENSEMBLE_MODELS
+
+
+def model_factory(config: ModelConfig, n_outputs: int):
+    if is_ensemble(config):
+        return EnsembleRegressor([network_factory(config, 1) for _ in range(n_outputs)])
+
+    return network_factory(config, n_outputs)
+
+
+def network_factory(config: ModelConfig, n_outputs: int):
     id = config.model
     hps = config.hyperparameters
     n_inputs = len(config.features)
-    n_outputs = len(config.targets) if config.single_model else 1
 
     if id == "gp":
         return GPRegressor(
@@ -32,6 +61,33 @@ def model_factory(config: ModelConfig):
             mean=hps["mean"],
         )
 
+    if id == "streaming_gp":
+        return StreamingGPRegressor(
+            n_inducing_points=hps["n_inducing_points"],
+            n_inputs=n_inputs,
+            n_outputs=n_outputs,
+            kernel=hps["kernel"],
+            mean=hps["mean"],
+        )
+
+    if id == "rls":
+        return RLSRegressor(
+            n_inputs=n_inputs,
+            n_outputs=n_outputs,
+            forgetting=hps["forgetting"],
+            delta=hps["delta"],
+        )
+
+    if id == "rff_rls":
+        return RLSRegressor(
+            n_inputs=n_inputs,
+            n_outputs=n_outputs,
+            n_random_features=hps["n_random_features"],
+            lengthscale=hps["lengthscale"],
+            forgetting=hps["forgetting"],
+            delta=hps["delta"],
+        )
+
     if id == "fnn":
         return FeedforwardRegressor(
             n_inputs=n_inputs,
@@ -59,21 +115,70 @@ def model_factory(config: ModelConfig):
             n_outputs=n_outputs,
             hidden_dims=hps["hidden_dims"],
             dropout=hps["dropout"],
+            n_heads=hps["n_heads"],
         )
 
     raise ValueError(f"Unknown model id: {id}")
 
 
-class Model:
-    def __init__(self, config: ModelConfig) -> None:
-        self.train_model = model_factory(config)
+def dataloader_epochs(x: torch.Tensor, y: torch.Tensor, epochs: int, batch_size: int):
+    dataloader = DataLoader(TensorDataset(x, y), batch_size=batch_size, shuffle=True)
+    for _ in range(epochs):
+        yield dataloader
+
+
+def tensor_epochs(x: torch.Tensor, y: torch.Tensor, epochs: int, batch_size: int):
+    """
+    shuffles into preallocated tensors once per epoch and slices them into
+    mini-batches, without the collation of a DataLoader
+    """
+    n = len(x)
+    x_epoch = torch.empty_like(x)
+    y_epoch = torch.empty_like(y)
+
+    for _ in range(epochs):
+        perm = torch.randperm(n)
+        torch.index_select(x, 0, perm, out=x_epoch)
+        torch.index_select(y, 0, perm, out=y_epoch)
+
+        yield [(x_epoch[i:i+batch_size], y_epoch[i:i+batch_size]) for i in range(0, n, batch_size)]
+
+
+BATCHING = {
+    "dataloader": dataloader_epochs,
+    "tensor": tensor_epochs,
+}
+
+
+class Trainer:
+    def __init__(self, config: ModelConfig, targets: list[str]) -> None:
+        """
+        training model and its soft-updated inference copy
+
+        the loss, the optimizer and the lr scheduler live across rounds, so
+        every round continues the optimization of the previous one
+
+        arguments
+        ---------
+        targets: list[str]
+            outputs of the model, used to report the loss of each one
+        """
+        self.targets = targets
+        self.ensemble = is_ensemble(config)
+        self.online = config.model in ONLINE_MODELS
+
+        self.train_model = model_factory(config, len(targets))
+
+        # probability that a sample of the round trains each head
+        self.bootstrap = 1.0
+        if config.model == "multi_head_fnn":
+            self.bootstrap = config.hyperparameters["bootstrap"]
         self.train_model.train()
 
         self.inference_model = deepcopy(self.train_model)
         self.inference_model.load_state_dict(self.train_model.state_dict())
         self.inference_model.eval()
 
-        self.training_thread = None
         self.is_training = False
 
         self.epochs = config.epochs
@@ -81,16 +186,45 @@ class Model:
         self.lr = config.lr
         self.tau = config.tau
 
-    def start(self, x: np.ndarray, y: np.ndarray) -> None:
-        self.training_thread = threading.Thread(
-            target=self.train,
-            args=(x, y),
+        if config.batching not in BATCHING:
+            raise ValueError(f"Unknown batching: {config.batching}")
+        self.epochs_fn = BATCHING[config.batching]
+
+        # num_data of the elbo is set every round
+        self.loss_fn = torch.nn.MSELoss(reduction="none") if not isinstance(self.train_model, GPRegressor) else VariationalELBO(
+            self.train_model.likelihood, self.train_model, num_data=config.max_samples
         )
-        self.training_thread.start()
+        # online models are solved in closed form
+        self.optimizer = AdamW(self.train_model.parameters(), lr=self.lr) if not self.online else None
+        self.scheduler = ExponentialLR(self.optimizer, config.lr_decay) if config.lr_decay != 1.0 and not self.online else None
 
-    def close(self) -> None:
-        if self.training_thread is not None and self.training_thread.is_alive():
-            self.training_thread.join()
+        self.rounds = 0
+        self.steps = 0
+
+    def state_dict(self) -> dict:
+        """
+        copy of the train and inference models, the optimizer and the lr
+        scheduler
+        """
+        return deepcopy({
+            "train_model": self.train_model.state_dict(),
+            "inference_model": self.inference_model.state_dict(),
+            "optimizer": self.optimizer.state_dict() if self.optimizer is not None else None,
+            "scheduler": self.scheduler.state_dict() if self.scheduler is not None else None,
+            "rounds": self.rounds,
+            "steps": self.steps,
+        })
+
+    def load_state_dict(self, state: dict) -> None:
+        self.train_model.load_state_dict(state["train_model"])
+        self.inference_model.load_state_dict(state["inference_model"])
+        if self.optimizer is not None and state["optimizer"] is not None:
+            self.optimizer.load_state_dict(state["optimizer"])
+        if self.scheduler is not None and state["scheduler"] is not None:
+            self.scheduler.load_state_dict(state["scheduler"])
+
+        self.rounds = state["rounds"]
+        self.steps = state["steps"]
 
     def update_inference_model(self, mode: str) -> None:
         if mode == "soft":
@@ -98,13 +232,40 @@ class Model:
                 for target_param, param in zip(self.inference_model.parameters(), self.train_model.parameters()):
                     target_param.copy_(self.tau * param + (1 - self.tau) * target_param)
 
+                # buffers are not averaged. they hold state such as the
+                # initialized flag of the gp variational distribution, which
+                # resets the distribution to the prior if left at 0
+                for target_buffer, buffer in zip(self.inference_model.buffers(), self.train_model.buffers()):
+                    target_buffer.copy_(buffer)
+
         elif mode == "hard":
             self.inference_model.load_state_dict(self.train_model.state_dict())
 
-    def train(self, x: np.ndarray, y: np.ndarray) -> None:
+    def observe(self, x: np.ndarray, y: np.ndarray) -> None:
+        """
+        updates an online model with new samples and copies it into the
+        inference model
+
+        x: [n_samples, n_features]
+        y: [n_samples, n_targets]
+        """
+        self.train_model.update(torch.tensor(x, dtype=torch.float32), torch.tensor(y, dtype=torch.float32))
+        self.update_inference_model("hard")
+
+        self.steps += len(x)
+
+    def train(self,
+              x: np.ndarray,
+              y: np.ndarray,
+              on_epoch: Callable[[], None] | None = None,
+              n_data: int = 0,
+              ) -> None:
         """
         x: [n_samples, n_features]
         y: [n_samples, n_targets]
+        on_epoch: called after the inference model is updated at the end of
+        every epoch
+        n_data: samples seen so far, which the round is drawn from
         """
         self.is_training = True
 
@@ -119,57 +280,555 @@ class Model:
             sep="\n",
         )
 
-        dataset = TensorDataset(x_train, y_train)
-        dataloader = DataLoader(dataset, batch_size=self.batch_size, shuffle=True)
+        if isinstance(self.loss_fn, VariationalELBO):
+            self.loss_fn.num_data = len(x_train)
 
-        # Set up loss function and optimizer for the training model
-        loss_fn = torch.nn.MSELoss() if not isinstance(self.train_model, GPRegressor) else VariationalELBO(
-            self.train_model.likelihood, self.train_model, num_data=len(dataset)
-        )
-        optimizer = AdamW(self.train_model.parameters(), lr=self.lr)
+        # the streaming gp weighs the round against every sample seen so far
+        if isinstance(self.train_model, StreamingGPRegressor):
+            if self.train_model.observe(x_train, n_data):
+                self.update_inference_model("hard")
+            self.loss_fn.num_data = int(self.train_model.n_data)
+
+        # every head trains on its own bootstrap subset of the round, and so
+        # does every head of every member of an ensemble. the masks are
+        # appended to the targets so they are shuffled with them
+        n_heads = self.train_model.n_heads if self.bootstrap < 1.0 else 0
+        n_masks = n_heads * (len(self.targets) if self.ensemble else 1)
+        if n_heads:
+            masks = (torch.rand(len(x_train), n_masks) < self.bootstrap).float()
+            y_train = torch.cat([y_train.reshape(len(y_train), -1), masks], dim=1)
 
         # Set training mode
         self.train_model.train()
 
         start = time.time()
-        for _ in range(self.epochs):
-            for x_batch, y_batch in dataloader:
-                optimizer.zero_grad(set_to_none=True)
-
-                y_batch = y_batch.squeeze(-1)
-
-                output = self.train_model(x_batch)
-                loss = loss_fn(output, y_batch)
-                if isinstance(self.train_model, GPRegressor):
-                    loss = -loss  # type: ignore
+        steps = 0
+        for batches in self.epochs_fn(x_train, y_train, self.epochs, self.batch_size):
+            # loss of every output over the epoch
+            epoch_loss = torch.zeros(1 if isinstance(self.train_model, GPRegressor) else len(self.targets))
+
+            for x_batch, y_batch in batches:
+                self.optimizer.zero_grad(set_to_none=True)
+
+                if n_heads:
+                    y_batch, mask = y_batch[:, :-n_masks], y_batch[:, -n_masks:]
+
+                    # [n, heads, outputs], one forward for every head. the
+                    # mask is [n, heads, 1], or [n, heads, members]
+                    output = self.train_model.forward_heads(x_batch)
+                    mask = mask.reshape(len(mask), n_heads, -1)
+                    errors = self.loss_fn(output, y_batch.unsqueeze(1).expand_as(output)) * mask
+
+                    output_loss = errors.sum(dim=(0, 1)) / mask.sum(dim=(0, 1)).clamp(min=1.0)
+                    loss = output_loss.sum() if self.ensemble else output_loss.mean()
+                    output_loss = output_loss.detach()
+
+                elif isinstance(self.train_model, GPRegressor):
+                    output = self.train_model(x_batch)
+                    loss = -self.loss_fn(output, y_batch.squeeze(-1))  # type: ignore
+                    output_loss = loss.detach().reshape(1)
+                else:
+                    output = self.train_model(x_batch)
+                    n = len(x_batch)
+                    output_loss = self.loss_fn(output.reshape(n, -1), y_batch.reshape(n, -1)).mean(dim=0)
+
+                    # the members of an ensemble are independent models
+                    loss = output_loss.sum() if self.ensemble else output_loss.mean()
+                    output_loss = output_loss.detach()
 
                 loss.backward()  # type: ignore
                 torch.nn.utils.clip_grad_norm_(self.train_model.parameters(), 1.0)
 
-                optimizer.step()
+                self.optimizer.step()
+                steps += 1
+
+                epoch_loss += output_loss * len(x_batch)
 
             self.update_inference_model("soft")
+            if on_epoch is not None:
+                on_epoch()
 
         # self.update_inference_model("hard")
 
+        if self.scheduler is not None:
+            self.scheduler.step()
+
+        self.rounds += 1
+        self.steps += steps
+        duration = time.time() - start
+
         self.is_training = False
 
+        epoch_loss = (epoch_loss / len(x_train)).tolist()
+        if isinstance(self.train_model, GPRegressor):
+            loss_line = f"   |> loss: {epoch_loss[0]:.4f}"
+        else:
+            loss_line = "   |> loss: " + " | ".join(f"{t} {l:.4f}" for t, l in zip(self.targets, epoch_loss))
+
         print(
-            f"   |> duration: {time.time() - start:.2f} s\n",
+            f"   |> round: {self.rounds} ({self.steps} steps in total)",
+            f"   |> lr: {self.optimizer.param_groups[0]['lr']:.2e}",
+            loss_line,
+            f"   |> steps: {steps} ({steps / max(duration, 1e-9):.0f} steps/s)",
+            f"   |> duration: {duration:.2f} s\n",
+            sep="\n",
             end="\n\n",
         )
 
-    @torch.no_grad()
+
+def _train_worker(config: ModelConfig,
+                  targets: list[str],
+                  state: dict[str, torch.Tensor],
+                  samples_name: str,
+                  samples_shape: tuple[int, int],
+                  exchange_name: str,
+                  conn,
+                  ) -> None:
+    # runs in the training process until it receives None. interrupts are
+    # handled by the main process, which stops the worker
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    trainer = Trainer(config, targets)
+    trainer.train_model.load_state_dict(state)
+    trainer.update_inference_model("hard")
+
+    samples = SharedArray(samples_shape, name=samples_name, create=False)
+    exchange = WeightExchange(trainer.inference_model.state_dict(), exchange_name)
+    inference_state = trainer.inference_model.state_dict()
+    n_features = len(config.features)
+
+    while (command := conn.recv()) is not None:
+        match command:
+            case ("train", n, y_ndim, n_data):
+                x = samples.array[:n, :n_features]
+                y = samples.array[:n, n_features:]
+
+                trainer.train(x, y[:, 0] if y_ndim == 1 else y, lambda: exchange.publish(inference_state), n_data)
+                conn.send(("done",))
+
+            case ("state",):
+                conn.send(("state", trainer.state_dict()))
+
+            case ("load", state):
+                trainer.load_state_dict(state)
+                exchange.publish(inference_state)
+
+    samples.close()
+    exchange.close()
+
+
+def _stop_worker(conn,
+                 process,
+                 samples: SharedArray,
+                 exchange: WeightExchange,
+                 stop_event: threading.Event,
+                 follower: threading.Thread,
+                 ) -> None:
+    stop_event.set()
+    follower.join()
+
+    try:
+        conn.send(None)
+    except (BrokenPipeError, OSError):
+        pass
+
+    process.join(timeout=5)
+    if process.is_alive():
+        process.terminate()
+
+    samples.close()
+    exchange.close()
+
+
+class InferenceSlot:
+    def __init__(self, model: torch.nn.Module, traced: bool, n_features: int) -> None:
+        """
+        one buffer of the double-buffered inference model. `seq` is odd while
+        the weights are written
+        """
+        self.model = model
+        self.model.eval()
+        self.state = model.state_dict()
+        self.seq = 0
+
+        if isinstance(model, StreamingGPRegressor):
+            self.forward = model.predict_cached
+
+        elif isinstance(model, GPRegressor):
+            self.forward = lambda x: self.model.likelihood(self.model(x)).mean
+
+        elif traced:
+            # the trace shares the parameters of the model, so the weights
+            # written into the slot reach it in place
+            with torch.no_grad():
+                self.forward = torch.jit.trace(model, torch.zeros(2, n_features))
+
+        else:
+            self.forward = model
+
+    def written(self) -> None:
+        # the predictive terms follow the new weights
+        if isinstance(self.model, StreamingGPRegressor):
+            self.model.cache()
+
+        # gpytorch caches the inducing point terms until the model is set to train
+        elif isinstance(self.model, GPRegressor):
+            self.model.train()
+            self.model.eval()
+
+
+class Model:
+    def __init__(self, config: ModelConfig, targets: list[str]) -> None:
+        """
+        trainable model with a double-buffered inference copy
+
+        the "thread" backend trains on a thread of this process. the "process"
+        backend trains in a worker process, so training does not compete for
+        the interpreter with ingest, prediction and plotting. the samples are
+        passed through shared memory, and the worker publishes the inference
+        weights through a `WeightExchange`. online models have no training
+        rounds, `observe` updates them in place with either backend
+
+        new inference weights are written into the back slot, which is then
+        swapped in with its version as a single assignment. `predict` never
+        locks: it runs the front slot and retries if the slot was rewritten
+        meanwhile, so no prediction mixes two sets of weights
+
+        the "traced" inference runs a TorchScript trace of the inference model
+        under inference mode, with preallocated input and output buffers
+
+        `inference_threads` sets the intra-op threads of torch for the whole
+        process. with the thread backend it limits the training as well, only
+        the worker of the process backend keeps its own threads. if the worker
+        dies, the model falls back to the thread backend
+
+        arguments
+        ---------
+        targets: list[str]
+            outputs of the model: one target, every target of a single model,
+            or the members of an ensemble
+        """
+        self.trainer = Trainer(config, targets)
+        self.train_model = self.trainer.train_model
+        self.online = self.trainer.online
+
+        self.training_thread = None
+        self.process = None
+
+        # intra-op threads of the whole process, training threads included
+        if config.inference_threads > 0:
+            torch.set_num_threads(config.inference_threads)
+
+        if config.inference not in ("eager", "traced"):
+            raise ValueError(f"Unknown inference: {config.inference}")
+
+        self.fast = config.inference == "traced"
+        if self.fast and isinstance(self.train_model, GPRegressor):
+            print(
+                f"{ansi.BOLD}{ansi.YELLOW}-> gp models cannot be traced{ansi.RESET}",
+                "   |> using the cached predictive terms" if isinstance(self.train_model, StreamingGPRegressor) else "   |> using the eager model with the fast path buffers",
+                sep="\n",
+                end="\n\n",
+            )
+
+        n_features = len(config.features)
+        self.slots = [
+            InferenceSlot(deepcopy(self.trainer.inference_model), self.fast, n_features)
+            for _ in range(2)
+        ]
+
+        # (version, slot) swapped as a whole
+        self.front: tuple[int, InferenceSlot] = (0, self.slots[0])
+
+        # per-thread input and output buffers by number of samples
+        self.buffers = threading.local()
+
+        if config.backend not in ("thread", "process"):
+            raise ValueError(f"Unknown training backend: {config.backend}")
+
+        # online models update on the main thread, they have nothing to offload
+        if config.backend == "process" and not self.online:
+            # rows of [features, targets], at most max_samples per round
+            self.samples = SharedArray((config.max_samples, n_features + len(targets)))
+
+            self.exchange = WeightExchange(self.trainer.inference_model.state_dict())
+            self.training = False
+            self.state = None
+
+            context = mp.get_context("spawn")
+            self.conn, worker_conn = context.Pipe()
+            self.process = context.Process(
+                target=_train_worker,
+                args=(
+                    config,
+                    targets,
+                    self.train_model.state_dict(),
+                    self.samples.name,
+                    self.samples.shape,
+                    self.exchange.name,
+                    worker_conn,
+                ),
+                daemon=True,
+            )
+            self.process.start()
+
+            # the worker holds the only other end, so its exit closes the pipe
+            worker_conn.close()
+
+            # the only writer of the inference slots
+            self.stop_event = threading.Event()
+            self.follower = threading.Thread(target=self._follow, daemon=True)
+            self.follower.start()
+
+            # stops the worker and frees the shared memory
+            self.stopper = weakref.finalize(
+                self,
+                _stop_worker,
+                self.conn,
+                self.process,
+                self.samples,
+                self.exchange,
+                self.stop_event,
+                self.follower,
+            )
+
+    @property
+    def inference_model(self) -> torch.nn.Module:
+        return self.front[1].model
+
+    @property
+    def version(self) -> int:
+        return self.front[0]
+
+    @property
+    def is_training(self) -> bool:
+        if self.process is not None:
+            self._receive()
+
+        if self.process is None:
+            return self.trainer.is_training
+
+        return self.training
+
+    def _receive(self, timeout: float = 0.0) -> None:
+        # replies of the training process
+        try:
+            while self.conn.poll(timeout):
+                timeout = 0.0
+                match self.conn.recv():
+                    case ("done",):
+                        self.training = False
+                    case ("state", state):
+                        self.state = state
+        except (EOFError, OSError) as e:
+            self._fall_back(repr(e))
+            return
+
+        if not self.process.is_alive():
+            self._fall_back(f"exit code {self.process.exitcode}")
+
+    def _send(self, message: tuple) -> bool:
+        try:
+            self.conn.send(message)
+        except OSError as e:
+            self._fall_back(repr(e))
+            return False
+
+        return True
+
+    def _fall_back(self, reason: str) -> None:
+        """
+        the training process died: the model goes on with the thread backend,
+        from the last weights it published. the round it was training and the
+        optimizer state are lost
+        """
+        print(
+            f"{ansi.BOLD}{ansi.YELLOW}-> training process lost{ansi.RESET}",
+            f"   |> {reason}",
+            "   |> training on a thread from the last published weights",
+            sep="\n",
+            end="\n\n",
+        )
+
+        self.stopper()
+        self.process = None
+        self.training = False
+
+        state = self.front[1].state
+        with torch.no_grad():
+            self.trainer.train_model.load_state_dict(state)
+            self.trainer.inference_model.load_state_dict(state)
+
+    def start(self, x: np.ndarray, y: np.ndarray, n_data: int = 0) -> None:
+        """
+        trains a round in the background. n_data: samples seen so far, which
+        the round is drawn from
+        """
+        if self.process is not None:
+            # newest samples if there are more than the shared block holds
+            n = min(len(x), self.samples.shape[0])
+            n_features = x.shape[1]
+            self.samples.array[:n, :n_features] = x[len(x)-n:]
+            self.samples.array[:n, n_features:] = y[len(y)-n:].reshape(n, -1)
+
+            self.training = True
+            if self._send(("train", n, y.ndim, n_data)):
+                return
+
+        self.training_thread = threading.Thread(
+            target=self.trainer.train,
+            args=(x, y, self._publish, n_data),
+        )
+        self.training_thread.start()
+
+    def close(self) -> None:
+        """
+        waits for the current training round
+        """
+        while self.process is not None and self.training:
+            self._receive(0.1)
+
+        if self.process is not None:
+            return
+
+        if self.training_thread is not None and self.training_thread.is_alive():
+            self.training_thread.join()
+
+    def checkpoint(self) -> dict:
+        """
+        copy of the train and inference models and the optimizer, taken after
+        the current training round
+        """
+        self.close()
+        self.state = None
+        if self.process is not None and self._send(("state",)):
+            while self.state is None and self.process is not None:
+                self._receive(0.1)
+
+            if self.state is not None:
+                return self.state
+
+        return self.trainer.state_dict()
+
+    def check(self, state: dict) -> None:
+        """
+        raises a ValueError if the weights of a checkpoint do not fit the model
+        """
+        for name, model in (("train_model", self.trainer.train_model), ("inference_model", self.trainer.inference_model)):
+            expected = {k: tuple(v.shape) for k, v in model.state_dict().items()}
+            found = {k: tuple(v.shape) for k, v in state[name].items()}
+            if expected != found:
+                mismatched = sorted(set(expected.items()) ^ set(found.items()))
+                raise ValueError(f"Checkpoint does not match the {name}: {mismatched[0][0]}")
+
+    def restore(self, state: dict) -> None:
+        """
+        loads a checkpoint. must not be called during a training round
+        """
+        if self.process is not None and self._send(("load", state)):
+            return
+
+        self.trainer.load_state_dict(state)
+        self._publish()
+
+    def _swap(self, write: Callable[[dict[str, torch.Tensor]], int | None]) -> None:
+        """
+        writes the back slot with `write`, which returns the new version or
+        None if nothing was written, and swaps it in
+        """
+        _, front = self.front
+        back = self.slots[1] if front is self.slots[0] else self.slots[0]
+
+        back.seq += 1
+        version = write(back.state)
+        if version is not None:
+            back.written()
+        back.seq += 1
+
+        if version is not None:
+            self.front = (version, back)
+
+    def _publish(self) -> None:
+        # thread backend, the training thread publishes after every epoch
+        def write(state: dict[str, torch.Tensor]) -> int:
+            with torch.no_grad():
+                for k, v in self.trainer.inference_model.state_dict().items():
+                    state[k].copy_(v)
+
+            return self.front[0] + 1
+
+        self._swap(write)
+
+    def _follow(self) -> None:
+        # process backend, swaps in the weights published by the worker
+        while not self.stop_event.wait(0.002):
+            self._swap(self.exchange.read)
+
+    def update_inference_model(self, mode: str) -> None:
+        self.trainer.update_inference_model(mode)
+        self._publish()
+
+    def observe(self, x: np.ndarray, y: np.ndarray) -> None:
+        """
+        online models: updates with new samples and swaps in the new weights
+        """
+        self.trainer.observe(x, y)
+        self._publish()
+
+    def train(self, x: np.ndarray, y: np.ndarray, n_data: int = 0) -> None:
+        self.trainer.train(x, y, self._publish, n_data)
+
     def predict(self, x: np.ndarray) -> np.ndarray:
         """
         x: [n_samples, n_features]
-        Returns the prediction mean and standard deviation from the inference model.
+        Returns the prediction mean from the inference model.
         """
-        input_tensor = torch.tensor(x, dtype=torch.float32)
+        return self.predict_tagged(x)[0]
 
-        if isinstance(self.train_model, GPRegressor):
-            output = self.inference_model.likelihood(self.inference_model(input_tensor)).mean
-        else:
-            output = self.inference_model(input_tensor)
+    def predict_tagged(self, x: np.ndarray, retries: int = 8) -> tuple[np.ndarray, int]:
+        """
+        prediction and the version of the weights that produced it. with the
+        traced inference, the array is reused by the next call of the thread
+        """
+        for _ in range(retries):
+            version, slot = self.front
+            seq = slot.seq
+            if seq % 2:
+                continue
+
+            output = self._predict_fast(slot, x) if self.fast else self._predict_eager(slot, x)
+            if slot.seq == seq:
+                return output, version
+
+        # the writer kept overtaking, the newest slot is used as is
+        version, slot = self.front
+
+        return self._predict_fast(slot, x) if self.fast else self._predict_eager(slot, x), version
+
+    @torch.no_grad()
+    def _predict_eager(self, slot: InferenceSlot, x: np.ndarray) -> np.ndarray:
+        input_tensor = torch.tensor(x, dtype=torch.float32)
+        output = slot.forward(input_tensor)
 
         return output.detach().numpy().astype(float)
+
+    def _predict_fast(self, slot: InferenceSlot, x: np.ndarray) -> np.ndarray:
+        buffers = self.buffers.__dict__.setdefault("by_size", {})
+        if len(x) not in buffers:
+            if len(buffers) >= 8:
+                buffers.clear()
+            buffers[len(x)] = (torch.empty((len(x), x.shape[1])), None)
+
+        input_tensor, output = buffers[len(x)]
+        input_tensor.copy_(torch.from_numpy(np.asarray(x)))
+
+        with torch.inference_mode():
+            result = slot.forward(input_tensor)
+
+        if output is None:
+            output = np.empty(tuple(result.shape))
+            buffers[len(x)] = (input_tensor, output)
+
+        np.copyto(output, result.numpy())
+
+        return output
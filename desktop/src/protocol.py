@@ -0,0 +1,345 @@
+import json
+import struct
+import time
+
+import numpy as np
+
+from .latency import LatencyHistogram
+from .sequence import SequenceTracker
+
+
+# ======
+# FORMAT
+# ======
+# every binary datagram starts with the same little-endian header:
+#   magic (2s) | version (B) | kind (B) | schema id (H) | count (H)
+#
+# - schema packets carry the channel names as utf-8, separated by "\n".
+#   count is the number of channels
+# - record packets follow the header with
+#     sequence number of the first record (I) | sender time in s (d)
+#   and then carry `count` records of float32 values, one per channel, in the
+#   order announced by the schema with the same id
+#
+# anything that does not start with the magic is treated as json. json samples
+# may carry "seq" and "timestamp" (ms) keys to enable loss tracking
+#
+# sender times are wall-clock, so the receipt latency derived from them is
+# only meaningful between hosts with synchronized clocks
+MAGIC = b"TF"
+VERSION = 2
+
+SCHEMA = 0
+RECORDS = 1
+
+HEADER = struct.Struct("<2sBBHH")
+RECORD_HEADER = struct.Struct("<Id")
+RECORD_OFFSET = HEADER.size + RECORD_HEADER.size
+
+MODES = ("auto", "json", "binary")
+
+
+class Schema:
+    def __init__(self, channels: list[str]) -> None:
+        self.channels = list(channels)
+        self.record = struct.Struct(f"<{len(self.channels)}f")
+        self.dtype = np.dtype("<f4")
+
+    def values(self, datagram: bytes, count: int) -> np.ndarray:
+        """
+        returns: [count, n_channels]
+        """
+        return np.frombuffer(
+            datagram,
+            dtype=self.dtype,
+            count=count*len(self.channels),
+            offset=RECORD_OFFSET,
+        ).reshape(count, len(self.channels))
+
+    def unpack(self, datagram: bytes, count: int) -> list[dict[str, float]]:
+        if count == 1:
+            return [dict(zip(self.channels, self.record.unpack_from(datagram, RECORD_OFFSET)))]
+
+        return [dict(zip(self.channels, row)) for row in self.values(datagram, count).tolist()]
+
+    def gap(self, n: int) -> list[dict[str, float]]:
+        return [dict.fromkeys(self.channels, np.nan) for _ in range(n)]
+
+
+class Encoder:
+    def __init__(self, channels: list[str], schema_id: int = 0, schema_every: int = 100) -> None:
+        """
+        binary frame encoder
+
+        arguments
+        ---------
+        channels: list[str]
+            channel names, in record order
+        schema_id: int
+            id announced in the schema packet and stamped on every record packet
+        schema_every: int
+            number of record packets between schema packets, so a receiver that
+            missed the handshake can pick up the stream
+        """
+        self.schema = Schema(channels)
+        self.schema_id = schema_id
+        self.schema_every = schema_every
+        self.sent = 0
+        self.seq = 0
+
+    def encode_schema(self) -> bytes:
+        names = "\n".join(self.schema.channels).encode("utf-8")
+        header = HEADER.pack(MAGIC, VERSION, SCHEMA, self.schema_id, len(self.schema.channels))
+
+        return header + names
+
+    def _record_header(self, count: int) -> bytes:
+        header = HEADER.pack(MAGIC, VERSION, RECORDS, self.schema_id, count)
+        header += RECORD_HEADER.pack(self.seq & 0xFFFFFFFF, time.time())
+        self.seq += count
+
+        return header
+
+    def encode(self, sample: dict[str, float]) -> bytes:
+        header = self._record_header(1)
+
+        return header + self.schema.record.pack(*[sample[k] for k in self.schema.channels])
+
+    def encode_many(self, records: np.ndarray) -> bytes:
+        """
+        records: [n_records, n_channels]
+        """
+        records = np.ascontiguousarray(records, dtype=self.schema.dtype)
+        header = self._record_header(len(records))
+
+        return header + records.tobytes()
+
+    def needs_schema(self) -> bool:
+        needs = self.sent % self.schema_every == 0
+        self.sent += 1
+
+        return needs
+
+
+class Decoder:
+    def __init__(self,
+                 mode: str = "auto",
+                 fill_gaps: bool = False,
+                 stamp: str | None = None,
+                 latency: LatencyHistogram | None = None,
+                 ) -> None:
+        """
+        datagram decoder
+
+        arguments
+        ---------
+        mode: str
+            auto, json or binary. auto detects binary frames by their magic and
+            falls back to json otherwise
+        fill_gaps: bool
+            insert nan records in place of lost ones to keep the columns aligned
+        stamp: str | None
+            channel added to every record with its receive time from
+            time.monotonic_ns(). filled records get nan
+        latency: LatencyHistogram | None
+            histogram of the sender to receiver latency of the packets that
+            carry a sender time
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown protocol mode: {mode}")
+
+        self.mode = mode
+        self.fill_gaps = fill_gaps
+        self.stamp = stamp
+        self.latency = latency
+        self.schemas: dict[int, Schema] = {}
+        self.tracker = SequenceTracker()
+
+    def _track(self, seq: int, count: int, sent_time: float | None, recv_ns: int) -> int:
+        if self.latency is not None and sent_time is not None:
+            self.latency.record(time.time_ns() - sent_time * 1e9)
+
+        return self.tracker.update(seq, count, sent_time, recv_ns * 1e-9)
+
+    def _parse(self, datagram: bytes, recv_ns: int) -> tuple[Schema, int, int] | None:
+        """
+        parses a binary frame and returns its schema, record count and the
+        number of records lost right before it. schema packets are registered
+        and, like malformed, late or duplicated frames and records without a
+        known schema, return None
+        """
+        if len(datagram) < HEADER.size:
+            return None
+
+        magic, version, kind, schema_id, count = HEADER.unpack_from(datagram)
+        if magic != MAGIC or version != VERSION:
+            return None
+
+        if kind == SCHEMA:
+            names = datagram[HEADER.size:].decode("utf-8").split("\n")
+            schema = self.schemas.get(schema_id)
+            if schema is None or schema.channels != names:
+                self.schemas[schema_id] = Schema(names)
+
+            return None
+
+        # records before the schema packet are dropped
+        schema = self.schemas.get(schema_id)
+        if kind != RECORDS or schema is None:
+            return None
+
+        if len(datagram) < RECORD_OFFSET + count*schema.record.size:
+            return None
+
+        seq, sent_time = RECORD_HEADER.unpack_from(datagram, HEADER.size)
+        gap = self._track(seq, count, sent_time, recv_ns)
+        if gap < 0:
+            return None
+
+        return schema, count, gap
+
+    def _parse_json(self, datagram: bytes, recv_ns: int) -> tuple[dict, int] | None:
+        sample = json.loads(datagram.decode("utf-8"))
+        if self.stamp is not None:
+            sample[self.stamp] = recv_ns
+
+        if "seq" not in sample:
+            return sample, 0
+
+        sent_time = sample["timestamp"] / 1000 if "timestamp" in sample else None
+        gap = self._track(int(sample["seq"]), 1, sent_time, recv_ns)
+        if gap < 0:
+            return None
+
+        return sample, gap
+
+    def _is_json(self, datagram: bytes) -> bool:
+        return self.mode == "json" or (self.mode == "auto" and not datagram.startswith(MAGIC))
+
+    def _stamp(self, samples: list[dict[str, float]], recv_ns: float) -> list[dict[str, float]]:
+        if self.stamp is not None:
+            for sample in samples:
+                sample[self.stamp] = recv_ns
+
+        return samples
+
+    def decode(self, datagram: bytes, recv_ns: int | None = None) -> list[dict[str, float]]:
+        """
+        recv_ns: receive time from time.monotonic_ns(). now if None
+        """
+        if recv_ns is None:
+            recv_ns = time.monotonic_ns()
+
+        if self._is_json(datagram):
+            parsed = self._parse_json(datagram, recv_ns)
+            if parsed is None:
+                return []
+
+            sample, gap = parsed
+            if not self.fill_gaps or not gap:
+                return [sample]
+
+            return [dict.fromkeys(sample, np.nan) for _ in range(gap)] + [sample]
+
+        parsed = self._parse(datagram, recv_ns)
+        if parsed is None:
+            return []
+
+        schema, count, gap = parsed
+        samples = self._stamp(schema.unpack(datagram, count), recv_ns)
+        if not self.fill_gaps or not gap:
+            return samples
+
+        return self._stamp(schema.gap(gap), np.nan) + samples
+
+    def decode_block(self,
+                     datagrams: list[bytes],
+                     recv_ns: list[int] | None = None,
+                     ) -> dict[str, np.ndarray]:
+        """
+        decodes several datagrams into one column block. channels missing from
+        some of the records are filled with nan to keep the columns aligned
+
+        recv_ns: receive time of every datagram from time.monotonic_ns()
+        """
+        if recv_ns is None:
+            recv_ns = [time.monotonic_ns()] * len(datagrams)
+
+        # consecutive records with the same channels are grouped in runs. json
+        # samples carry their stamp, binary runs keep it apart since the values
+        # are float32
+        runs: list[tuple[list[str], list[np.ndarray], list[np.ndarray]]] = []
+        json_keys: list[str] = []
+        json_rows: list[list[float]] = []
+
+        def flush_json() -> None:
+            if json_rows:
+                runs.append((json_keys, [np.array(json_rows, dtype=np.float64)], []))
+
+        for datagram, t in zip(datagrams, recv_ns):
+            if self._is_json(datagram):
+                parsed = self._parse_json(datagram, t)
+                if parsed is None:
+                    continue
+
+                sample, gap = parsed
+                keys = list(sample.keys())
+                if keys != json_keys:
+                    flush_json()
+                    json_keys, json_rows = keys, []
+
+                if self.fill_gaps and gap:
+                    json_rows.extend([[np.nan] * len(keys)] * gap)
+
+                json_rows.append(list(sample.values()))
+                continue
+
+            parsed = self._parse(datagram, t)
+            if parsed is None:
+                continue
+
+            flush_json()
+            json_keys, json_rows = [], []
+
+            schema, count, gap = parsed
+            values = schema.values(datagram, count)
+            stamps = np.full(count, t, dtype=np.float64)
+            if self.fill_gaps and gap:
+                values = np.concatenate([np.full((gap, len(schema.channels)), np.nan, dtype=schema.dtype), values])
+                stamps = np.concatenate([np.full(gap, np.nan), stamps])
+
+            if runs and runs[-1][0] is schema.channels:
+                runs[-1][1].append(values)
+                runs[-1][2].append(stamps)
+            else:
+                runs.append((schema.channels, [values], [stamps]))
+
+        flush_json()
+
+        if len(runs) == 1:
+            channels, blocks, stamps = runs[0]
+            values = np.concatenate(blocks, dtype=np.float64)
+            columns = {k: values[:, i] for i, k in enumerate(channels)}
+            if self.stamp is not None and stamps:
+                columns[self.stamp] = np.concatenate(stamps)
+
+            return columns
+
+        n = sum(len(b) for _, blocks, _ in runs for b in blocks)
+        columns: dict[str, np.ndarray] = {}
+        offset = 0
+        for channels, blocks, stamps in runs:
+            values = np.concatenate(blocks, dtype=np.float64)
+            for i, k in enumerate(channels):
+                if k not in columns:
+                    columns[k] = np.full(n, np.nan)
+                columns[k][offset:offset+len(values)] = values[:, i]
+
+            if self.stamp is not None and stamps:
+                if self.stamp not in columns:
+                    columns[self.stamp] = np.full(n, np.nan)
+                columns[self.stamp][offset:offset+len(values)] = np.concatenate(stamps)
+
+            offset += len(values)
+
+        return columns
@@ -0,0 +1,183 @@
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+# ======
+# FORMAT
+# ======
+# a recorded session is a directory with
+#   meta.json: {"version": 1, "dtype": "<f8", "columns": [name, ...], "starts": [index, ...]}
+#   {i}.f64: raw little-endian float64 values of the i-th column
+#
+# columns are only ever appended to, so a crash loses at most the chunks that
+# were not written yet, and a column file can be memory-mapped as it is.
+# columns may have different lengths: a column that appears late, like the
+# predictions, ends with the recording when it first appears, and "starts"
+# holds the sample index of its first value
+VERSION = 1
+DTYPE = "<f8"
+META = "meta.json"
+
+
+class Recorder:
+    def __init__(self, path: str, chunk_size: int = 1024) -> None:
+        """
+        append-only columnar session writer
+
+        samples are gathered in chunks on the caller's thread and written by a
+        background thread, so appending never touches the disk
+
+        arguments
+        ---------
+        path: str
+            session directory. it is created if it does not exist
+        chunk_size: int
+            number of samples per written chunk
+        """
+        os.makedirs(path, exist_ok=True)
+
+        self.path = path
+        self.chunk_size = chunk_size
+
+        self.pending: dict[str, list[np.ndarray]] = {}
+        self.pending_rows: dict[str, int] = {}
+        self.rows: dict[str, int] = {}
+        self.starts: dict[str, int] = {}
+
+        self.queue: queue.Queue[dict[str, np.ndarray] | None] = queue.Queue()
+        self.thread = threading.Thread(target=self._write)
+        self.thread.start()
+
+    def append(self, d: dict) -> None:
+        """
+        d: a sample (dict[str, float]) or a column block (dict[str, np.ndarray])
+        """
+        for k, v in d.items():
+            v = np.atleast_1d(np.asarray(v, dtype=np.float64))
+            self.pending.setdefault(k, []).append(v)
+            self.pending_rows[k] = self.pending_rows.get(k, 0) + len(v)
+            self.rows[k] = self.rows.get(k, 0) + len(v)
+
+        # new columns are aligned to the end of the recording
+        for k in d:
+            if k not in self.starts:
+                self.starts[k] = len(self) - self.rows[k]
+
+        if max(self.pending_rows.values(), default=0) >= self.chunk_size:
+            self.flush()
+
+    def __len__(self) -> int:
+        # samples of the longest column
+        return max(self.rows.values(), default=0)
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+
+        chunk = {k: np.concatenate(v) for k, v in self.pending.items()}
+        self.pending = {}
+        self.pending_rows = {}
+
+        self.queue.put(chunk)
+
+    def close(self, wait: bool = False) -> None:
+        """
+        hands the last chunk to the writer. the writer thread finishes on its
+        own unless `wait` is set
+        """
+        self.flush()
+        self.queue.put(None)
+
+        if wait:
+            self.thread.join()
+
+    def _write_meta(self, columns: list[str]) -> None:
+        tmp = os.path.join(self.path, f"{META}.tmp")
+        with open(tmp, "w") as f:
+            starts = [self.starts[k] for k in columns]
+            json.dump({"version": VERSION, "dtype": DTYPE, "columns": columns, "starts": starts}, f)
+
+        os.replace(tmp, os.path.join(self.path, META))
+
+    def _write(self) -> None:
+        files = {}
+        columns: list[str] = []
+
+        while (chunk := self.queue.get()) is not None:
+            # column names come from the network, so files are numbered
+            new = [k for k in chunk if k not in files]
+            for k in new:
+                files[k] = open(os.path.join(self.path, f"{len(columns)}.f64"), "ab")
+                columns.append(k)
+
+            if new:
+                self._write_meta(columns)
+
+            for k, v in chunk.items():
+                files[k].write(v.astype(DTYPE, copy=False).tobytes())
+                files[k].flush()
+
+        for f in files.values():
+            f.close()
+
+
+def is_session(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, META))
+
+
+def _read_meta(path: str) -> dict:
+    with open(os.path.join(path, META)) as f:
+        meta = json.load(f)
+
+    if meta["version"] != VERSION:
+        raise ValueError(f"Unknown session version: {meta['version']}")
+
+    return meta
+
+
+def load_session(path: str) -> dict[str, np.ndarray]:
+    """
+    memory-maps every column of a recorded session. a column cut short by a
+    crash is read up to its last complete value
+    """
+    meta = _read_meta(path)
+
+    columns = {}
+    for i, k in enumerate(meta["columns"]):
+        filename = os.path.join(path, f"{i}.f64")
+        n = os.path.getsize(filename) // np.dtype(meta["dtype"]).itemsize
+
+        columns[k] = np.memmap(filename, dtype=meta["dtype"], mode="r", shape=(n,)) if n else np.empty(0)
+
+    return columns
+
+
+def export_csv(path: str, filename: str | None = None) -> str:
+    """
+    writes a recorded session as csv, one row per sample index. columns that
+    start late are padded with nan at the front, and columns cut short at the
+    end. returns the csv filename
+    """
+    if filename is None:
+        filename = f"{os.path.normpath(path)}.csv"
+
+    columns = load_session(path)
+
+    # sessions recorded before the starts were saved begin together
+    meta = _read_meta(path)
+    starts = dict(zip(meta["columns"], meta.get("starts", [])))
+    starts = {k: starts.get(k, 0) for k in columns}
+    n = max((starts[k] + len(v) for k, v in columns.items()), default=0)
+
+    frame = pd.DataFrame({
+        k: np.pad(v, (starts[k], n - starts[k] - len(v)), constant_values=np.nan)
+        for k, v in columns.items()
+    })
+    frame.to_csv(filename, index=False)
+
+    return filename
@@ -0,0 +1,145 @@
+import json
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import ansi
+from .protocol import Encoder, RECORD_OFFSET
+from .recorder import load_session
+
+
+# channels added by the pipeline itself are not replayed
+DERIVED = ("recv_ns", "age_ns", "seq", "timestamp")
+
+MAX_DATAGRAM = 4096
+
+
+def load_recording(path: str) -> dict[str, np.ndarray]:
+    """
+    columns of a recorded session. recordings are memory-mapped, csv files are
+    read into memory
+    """
+    if os.path.isdir(path):
+        return load_session(path)
+
+    return {k: v.to_numpy(dtype=np.float64) for k, v in pd.read_csv(path).items()}
+
+
+class Replay:
+    def __init__(self, path: str, speed: float = 1.0, protocol: str = "binary", dt: float = 0.01) -> None:
+        """
+        replays a recorded session into a running server over udp, so the
+        samples go through the same ingest path as the sensor's
+
+        arguments
+        ---------
+        path: str
+            recording directory or csv file, as written by `Data.save`
+        speed: float
+            playback speed relative to the recorded `time` channel. 0 replays
+            as fast as possible
+        protocol: str
+            json: one sample per datagram, like the sensor
+            binary: the samples due at once are packed in a single datagram
+        dt: float
+            sample period (s) when the recording has no `time` channel
+        """
+        if protocol not in ("json", "binary"):
+            raise ValueError(f"Unknown replay protocol: {protocol}")
+
+        columns = load_recording(path)
+        self.channels = [k for k in columns if k not in DERIVED and not k.endswith(("_pred", "_version"))]
+        self.columns = [columns[k] for k in self.channels]
+        self.n_samples = min((len(c) for c in self.columns), default=0)
+
+        if "time" in columns:
+            t = np.asarray(columns["time"][:self.n_samples], dtype=np.float64)
+            # lost samples have no time, they are sent with the previous one
+            t = np.fmax.accumulate(np.where(np.isfinite(t), t, -np.inf))
+            self.times = t - t[0] if self.n_samples else t
+        else:
+            self.times = np.arange(self.n_samples) * dt
+
+        self.path = path
+        self.speed = speed
+        self.protocol = protocol
+
+        self.encoder = Encoder(self.channels)
+        self.per_datagram = max((MAX_DATAGRAM - RECORD_OFFSET) // (4 * len(self.channels)), 1)
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.thread = None
+        self.running = False
+        self.done = threading.Event()
+
+        self.sent = 0
+        self.duration = 0.0
+
+    def start(self, host: str, port: int) -> None:
+        self.running = True
+        self.thread = threading.Thread(target=self._run, args=((host, port),), daemon=True)
+        self.thread.start()
+
+    def _send(self, start: int, end: int, address: tuple[str, int]) -> None:
+        if self.protocol == "json":
+            for i in range(start, end):
+                sample = {k: float(c[i]) for k, c in zip(self.channels, self.columns)}
+                sample.update(seq=i, timestamp=time.time() * 1000)
+                self.socket.sendto(json.dumps(sample).encode("utf-8"), address)
+            return
+
+        if self.encoder.needs_schema():
+            self.socket.sendto(self.encoder.encode_schema(), address)
+
+        records = np.column_stack([c[start:end] for c in self.columns])
+        self.socket.sendto(self.encoder.encode_many(records), address)
+
+    def _run(self, address: tuple[str, int]) -> None:
+        start = time.perf_counter()
+
+        i = 0
+        while i < self.n_samples and self.running:
+            end = self.n_samples
+            if self.speed > 0:
+                elapsed = (time.perf_counter() - start) * self.speed
+                end = int(np.searchsorted(self.times, elapsed, side="right"))
+                if end <= i:
+                    time.sleep(min((self.times[i] - elapsed) / self.speed, 0.001))
+                    continue
+
+            end = min(end, i + self.per_datagram)
+            self._send(i, end, address)
+
+            self.sent = end
+            i = end
+
+        self.duration = time.perf_counter() - start
+        self.done.set()
+
+        print(
+            f"{ansi.BOLD}{ansi.BLUE}-> replay finished{ansi.RESET}",
+            f"   |> path: {self.path}",
+            f"   |> speed: {f'{self.speed}x' if self.speed > 0 else 'max'}",
+            f"   |> samples: {self.sent}",
+            f"   |> duration: {self.duration:.2f} s",
+            f"   |> throughput: {self.throughput():.0f} samples/s",
+            sep="\n",
+            end="\n\n",
+        )
+
+    def finished(self) -> bool:
+        return self.done.is_set()
+
+    def throughput(self) -> float:
+        return self.sent / self.duration if self.duration > 0 else 0.0
+
+    def stop(self) -> None:
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+        self.socket.close()
@@ -0,0 +1,132 @@
+import numpy as np
+
+
+STRATEGIES = ("reservoir", "recency", "stratified")
+
+
+class ReplayBuffer:
+    def __init__(self,
+                 capacity: int,
+                 n_features: int,
+                 n_targets: int,
+                 strategy: str = "reservoir",
+                 bins: int = 8,
+                 seed: int | None = None,
+                 ) -> None:
+        """
+        bounded store of training samples that covers the whole session
+
+        every training round samples a fixed number of rows from it, so the
+        cost of a round does not grow with the session and early samples are
+        not forgotten
+
+        arguments
+        ---------
+        capacity: int
+            maximum number of stored samples
+        strategy: str
+            reservoir: uniform sample of every sample seen so far
+            recency: every new sample is stored and evicts a random one, so the
+                age of the stored samples decays exponentially
+            stratified: one reservoir per force magnitude bin, sampled evenly,
+                so rare high forces are kept next to the frequent low ones
+        bins: int
+            force magnitude bins of the stratified strategy
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown replay buffer strategy: {strategy}")
+
+        self.capacity = capacity
+        self.n_features = n_features
+        self.strategy = strategy
+        self.bins = bins if strategy == "stratified" else 1
+        self.rng = np.random.default_rng(seed)
+
+        # [features, targets] rows. bin b owns the slots [b*size, (b+1)*size)
+        self.size = capacity // self.bins
+        self.rows = np.empty((self.size * self.bins, n_features + n_targets), dtype=np.float32)
+        self.filled = np.zeros(self.bins, dtype=int)
+        self.seen = np.zeros(self.bins, dtype=int)
+        self.max_magnitude = 0.0
+
+    def clear(self) -> None:
+        self.filled[:] = 0
+        self.seen[:] = 0
+        self.max_magnitude = 0.0
+
+    def _bin(self, y: np.ndarray) -> np.ndarray:
+        if self.bins == 1:
+            return np.zeros(len(y), dtype=int)
+
+        # the edges follow the largest force seen so far
+        magnitude = np.linalg.norm(y, axis=1)
+        self.max_magnitude = max(self.max_magnitude, float(magnitude.max()))
+        if self.max_magnitude == 0.0:
+            return np.zeros(len(y), dtype=int)
+
+        return np.minimum((magnitude / self.max_magnitude * self.bins).astype(int), self.bins - 1)
+
+    def add(self, x: np.ndarray, y: np.ndarray) -> None:
+        """
+        x: [n_samples, n_features]
+        y: [n_samples, n_targets]
+        """
+        y = y.reshape(len(y), -1)
+        rows = np.hstack([x, y])
+        bins = self._bin(y)
+
+        for b in np.unique(bins):
+            new = rows[bins == b]
+            offset = b * self.size
+
+            # free slots are filled in order
+            n = min(len(new), self.size - self.filled[b])
+            start = self.filled[b]
+            self.rows[offset+start:offset+start+n] = new[:n]
+            self.filled[b] += n
+
+            rest = new[n:]
+            seen = self.seen[b] + n + np.arange(len(rest))
+            self.seen[b] += len(new)
+            if not len(rest):
+                continue
+
+            if self.strategy == "recency":
+                slots = self.rng.integers(self.size, size=len(rest))
+            else:
+                # algorithm R, the i-th sample is kept with probability size/(i+1)
+                slots = self.rng.integers(seen + 1)
+                rest = rest[slots < self.size]
+                slots = slots[slots < self.size]
+
+            self.rows[offset + slots] = rest
+
+    def sample(self, n: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        n rows without replacement, spread evenly over the bins. returns
+        x: [n, n_features] and y: [n, n_targets]
+        """
+        filled = [b for b in range(self.bins) if self.filled[b]]
+        indices = []
+
+        # bins with fewer rows than their share leave it to the others
+        remaining = n
+        for i, b in enumerate(sorted(filled, key=lambda b: self.filled[b])):
+            share = min(remaining // (len(filled) - i), self.filled[b])
+            chosen = self.rng.choice(self.filled[b], share, replace=False)
+            indices.append(b * self.size + chosen)
+            remaining -= share
+
+        rows = self.rows[np.concatenate(indices)] if indices else self.rows[:0]
+
+        return rows[:, :self.n_features], rows[:, self.n_features:]
+
+    @property
+    def n_seen(self) -> int:
+        """
+        samples added since the last clear, stored or not
+        """
+        return int(self.seen.sum())
+
+    def __len__(self) -> int:
+        return int(self.filled.sum())
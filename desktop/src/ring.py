@@ -0,0 +1,202 @@
+import queue
+import time
+
+import numpy as np
+
+
+POLICIES = ("overwrite", "block")
+
+
+class Latest:
+    def __init__(self) -> None:
+        """
+        one-slot mailbox per source. the writer overwrites the slot of its
+        source and the reader takes the newest value of the source it
+        follows, so neither side ever waits for the other and sources never
+        overwrite each other
+        """
+        # (version, sample) of every source, each one swapped as a whole. the
+        # versions are shared, so a reader switching sources never mistakes
+        # a new sample for the last one it read
+        self.slots: dict[str | None, tuple[int, dict[str, float] | None]] = {}
+        self.version = 0
+
+    def put(self, sample: dict[str, float], source: str | None = None) -> None:
+        # single writer
+        self.version += 1
+        self.slots[source] = (self.version, sample)
+
+    def get(self, source: str | None = None) -> tuple[int, dict[str, float] | None]:
+        return self.slots.get(source, (0, None))
+
+
+def newest(data: dict) -> dict[str, float]:
+    """
+    newest record of a sample or a column block
+    """
+    return {k: float(np.asarray(v).reshape(-1)[-1]) for k, v in data.items()}
+
+
+class RingBuffer:
+    def __init__(self,
+                 capacity: int,
+                 channels: list[str] | None = None,
+                 policy: str = "overwrite",
+                 timeout: float | None = None,
+                 ) -> None:
+        """
+        single-producer/single-consumer ring buffer of fixed-width float records
+
+        the producer only advances `tail` and the consumer only advances `head`,
+        so neither side takes a lock. it can replace the `queue.Queue` between
+        the server and the main loop: `put` accepts a sample or a column block,
+        and `get_nowait` returns every available record as a column block
+
+        arguments
+        ---------
+        capacity: int
+            number of records
+        channels: list[str] | None
+            record layout. if None, it is fixed by the first record. channels
+            missing from later records are stored as nan, unknown ones dropped
+        policy: str
+            overwrite: a full buffer overwrites the oldest records
+            block: a full buffer makes the producer wait for the consumer
+        timeout: float | None
+            maximum wait of the block policy before the record is dropped
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown ring buffer policy: {policy}")
+
+        self.capacity = capacity
+        self.policy = policy
+        self.timeout = timeout
+
+        self.channels: list[str] = []
+        self.index: dict[str, int] = {}
+        self.buffer = np.empty((0, 0))
+        if channels is not None:
+            self._set_channels(channels)
+
+        # monotonically increasing counters, the slot is counter % capacity
+        self.head = 0
+        self.tail = 0
+
+        # each counter is written by a single side
+        self.high_water_mark = 0
+        self.rejected = 0  # producer: oversized blocks and block timeouts
+        self.overwritten = 0  # consumer: records overwritten before being read
+
+    def _set_channels(self, channels: list[str]) -> None:
+        self.channels = list(channels)
+        self.index = {k: i for i, k in enumerate(self.channels)}
+        self.buffer = np.full((self.capacity, len(self.channels)), np.nan)
+
+    def _to_rows(self, item: dict) -> np.ndarray:
+        if not self.channels:
+            self._set_channels(list(item.keys()))
+
+        columns = [np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in item.values()]
+        rows = np.full((len(columns[0]), len(self.channels)), np.nan)
+        for k, v in zip(item.keys(), columns):
+            i = self.index.get(k)
+            if i is not None:
+                rows[:, i] = v
+
+        return rows
+
+    def _wait_for_space(self, n: int) -> bool:
+        start = time.monotonic()
+        while self.tail + n - self.head > self.capacity:
+            if self.timeout is not None and time.monotonic() - start > self.timeout:
+                return False
+            time.sleep(0.0005)
+
+        return True
+
+    # ========
+    # PRODUCER
+    # ========
+    def put(self, item: dict) -> None:
+        """
+        item: a sample (dict[str, float]) or a column block (dict[str, np.ndarray])
+        """
+        if not item:
+            return
+
+        rows = self._to_rows(item)
+        n = len(rows)
+
+        # only the newest records of an oversized block fit
+        if n > self.capacity:
+            self.rejected += n - self.capacity
+            rows = rows[-self.capacity:]
+            n = self.capacity
+
+        if self.policy == "block" and not self._wait_for_space(n):
+            self.rejected += n
+            return
+
+        tail = self.tail
+        start = tail % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start+first] = rows[:first]
+        self.buffer[:n-first] = rows[first:]
+
+        # publish after the rows are written
+        self.tail = tail + n
+
+        self.high_water_mark = max(self.high_water_mark, min(self.tail - self.head, self.capacity))
+
+    # ========
+    # CONSUMER
+    # ========
+    @property
+    def dropped(self) -> int:
+        return self.rejected + self.overwritten
+
+    def empty(self) -> bool:
+        return self.tail == self.head
+
+    def __len__(self) -> int:
+        return min(self.tail - self.head, self.capacity)
+
+    def get_nowait(self) -> dict[str, np.ndarray]:
+        """
+        returns every available record as a column block. raises queue.Empty
+        """
+        tail = self.tail
+        head = max(self.head, tail - self.capacity)
+        if head == tail:
+            raise queue.Empty
+
+        self.overwritten += head - self.head
+
+        indices = np.arange(head, tail) % self.capacity
+        rows = self.buffer[indices]
+
+        # records overwritten by the producer while copying are discarded
+        overwritten = self.tail - self.capacity - head
+        if overwritten > 0:
+            rows = rows[overwritten:]
+            self.overwritten += overwritten
+
+        self.head = tail
+        if not len(rows):
+            raise queue.Empty
+
+        return {k: rows[:, i] for i, k in enumerate(self.channels)}
+
+    def get(self) -> dict[str, np.ndarray]:
+        return self.get_nowait()
+
+    def latest(self) -> dict[str, float] | None:
+        """
+        returns the newest record and discards the rest
+        """
+        try:
+            block = self.get_nowait()
+        except queue.Empty:
+            return None
+
+        return {k: float(v[-1]) for k, v in block.items()}
@@ -0,0 +1,148 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, NamedTuple
+
+from . import ansi
+
+
+class TaskStats(NamedTuple):
+    rate: float  # Hz, target. 0 runs every tick
+    runs: int
+    actual_rate: float  # Hz
+    misses: int
+    deferred: int
+    mean_duration: float  # ms
+    max_duration: float  # ms
+    max_lateness: float  # ms
+
+
+@dataclass
+class Task:
+    name: str
+    period: float
+    func: Callable[[], None]
+    deferrable: bool = False
+
+    next_time: float = 0.0
+    runs: int = 0
+    misses: int = 0
+    deferred: int = 0
+    duration: float = 0.0  # exponential average
+    total_duration: float = 0.0
+    max_duration: float = 0.0
+    max_lateness: float = 0.0
+
+
+class Scheduler:
+    def __init__(self, idle: float = 0.001) -> None:
+        """
+        single-threaded multi-rate scheduler
+
+        every task runs at its own rate, in registration order when several are
+        due, so earlier tasks have priority. a periodic task that starts more
+        than a period late counts a deadline miss and is rescheduled from now
+        instead of catching up. deferrable tasks are postponed while their
+        expected duration would make a higher-priority task late
+
+        arguments
+        ---------
+        idle: float
+            maximum sleep between ticks (s), which bounds the latency of the
+            tasks that run every tick
+        """
+        self.idle = idle
+        self.tasks: list[Task] = []
+        self.start_time = time.monotonic()
+
+    def add(self, name: str, rate: float, func: Callable[[], None], deferrable: bool = False) -> None:
+        """
+        rate: Hz. 0 runs the task on every tick
+        """
+        self.tasks.append(Task(name, 1 / rate if rate > 0 else 0.0, func, deferrable, time.monotonic()))
+
+    def _blocks(self, task: Task, now: float) -> bool:
+        # a higher-priority periodic task is due before this one would end
+        for other in self.tasks:
+            if other is task:
+                return False
+            if other.period > 0 and other.next_time < now + task.duration:
+                return True
+
+        return False
+
+    def _run(self, task: Task, now: float) -> None:
+        lateness = now - task.next_time
+        if task.period > 0:
+            task.max_lateness = max(task.max_lateness, lateness)
+            if lateness > task.period:
+                task.misses += 1
+                task.next_time = now + task.period
+            else:
+                task.next_time += task.period
+
+        task.func()
+
+        duration = time.monotonic() - now
+        task.runs += 1
+        task.duration = duration if task.runs == 1 else 0.9 * task.duration + 0.1 * duration
+        task.total_duration += duration
+        task.max_duration = max(task.max_duration, duration)
+
+    def tick(self) -> None:
+        """
+        runs the due tasks and sleeps until the next one
+        """
+        for task in self.tasks:
+            now = time.monotonic()
+            if now < task.next_time:
+                continue
+
+            # deferred tasks still run once they would miss their deadline
+            if task.deferrable and now - task.next_time < task.period and self._blocks(task, now):
+                task.deferred += 1
+                continue
+
+            self._run(task, now)
+
+        upcoming = [t.next_time for t in self.tasks if t.period > 0]
+        delay = min(upcoming, default=0.0) - time.monotonic()
+        time.sleep(min(max(delay, 0.0), self.idle))
+
+    def stats(self) -> dict[str, TaskStats]:
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+
+        return {
+            task.name: TaskStats(
+                rate=1 / task.period if task.period > 0 else 0.0,
+                runs=task.runs,
+                actual_rate=task.runs / elapsed,
+                misses=task.misses,
+                deferred=task.deferred,
+                mean_duration=task.total_duration / task.runs * 1000 if task.runs else 0.0,
+                max_duration=task.max_duration * 1000,
+                max_lateness=task.max_lateness * 1000,
+            )
+            for task in self.tasks
+        }
+
+    def reset(self) -> None:
+        self.start_time = time.monotonic()
+        for task in self.tasks:
+            task.runs = task.misses = task.deferred = 0
+            task.total_duration = task.max_duration = task.max_lateness = 0.0
+
+    def report(self) -> None:
+        lines = [
+            f"   |> {name}: {s.actual_rate:.1f}/{s.rate:.0f} Hz | misses {s.misses} | deferred {s.deferred} | "
+            f"duration {s.mean_duration:.2f} ms (max {s.max_duration:.2f} ms) | max lateness {s.max_lateness:.2f} ms"
+            if s.rate else
+            f"   |> {name}: {s.actual_rate:.1f} Hz | duration {s.mean_duration:.2f} ms (max {s.max_duration:.2f} ms)"
+            for name, s in self.stats().items()
+        ]
+
+        print(
+            f"{ansi.BOLD}{ansi.BLUE}-> scheduler{ansi.RESET}",
+            *lines,
+            sep="\n",
+            end="\n\n",
+        )
@@ -0,0 +1,107 @@
+from typing import NamedTuple
+
+
+class StreamStats(NamedTuple):
+    received: int
+    lost: int
+    reordered: int
+    duplicates: int
+    loss_rate: float
+    jitter: float  # s
+    interarrival: float  # s
+
+
+class SequenceTracker:
+    def __init__(self, window: int = 1024) -> None:
+        """
+        receiver-side sequence number tracker
+
+        records arriving after a later one are counted as reordered and are
+        not delivered, since the columns have already moved past them. if they
+        were filled, the gap keeps its nan rows
+
+        arguments
+        ---------
+        window: int
+            how far back a late record is still recognized. records further
+            behind, or gaps larger than this, are treated as a sender restart
+        """
+        self.window = window
+        self.reset()
+
+    def reset(self) -> None:
+        self.expected: int | None = None
+        self.missing: set[int] = set()
+
+        self.received = 0
+        self.lost = 0
+        self.reordered = 0
+        self.duplicates = 0
+
+        self.jitter = 0.0
+        self.interarrival = 0.0
+        self.last_sent = None
+        self.last_recv = None
+
+    def update(self, seq: int, count: int, sent_time: float | None, recv_time: float) -> int:
+        """
+        registers a packet of `count` records starting at `seq`
+
+        returns the number of records missing right before the packet, or -1
+        if the packet is late or duplicated and must be discarded
+        """
+        if self.expected is None or abs(seq - self.expected) > self.window:
+            self.expected = seq
+            self.missing.clear()
+
+        # late or duplicated
+        if seq < self.expected:
+            if seq in self.missing:
+                self.missing.discard(seq)
+                self.lost -= 1
+                self.reordered += 1
+            else:
+                self.duplicates += 1
+
+            return -1
+
+        gap = seq - self.expected
+        if gap:
+            self.lost += gap
+            self.missing.update(range(self.expected, seq))
+
+            # forget missing records the window can no longer recover
+            if len(self.missing) > self.window:
+                self.missing = {s for s in self.missing if s >= seq - self.window}
+
+        self.expected = seq + count
+        self.received += count
+
+        self._update_timing(sent_time, recv_time)
+
+        return gap
+
+    def _update_timing(self, sent_time: float | None, recv_time: float) -> None:
+        # interarrival jitter as in rfc 3550
+        if self.last_recv is not None:
+            self.interarrival += (recv_time - self.last_recv - self.interarrival) / 16
+
+            if sent_time is not None and self.last_sent is not None:
+                d = (recv_time - self.last_recv) - (sent_time - self.last_sent)
+                self.jitter += (abs(d) - self.jitter) / 16
+
+        self.last_recv = recv_time
+        self.last_sent = sent_time
+
+    def stats(self) -> StreamStats:
+        total = self.received + self.lost
+
+        return StreamStats(
+            received=self.received,
+            lost=self.lost,
+            reordered=self.reordered,
+            duplicates=self.duplicates,
+            loss_rate=self.lost / total if total else 0.0,
+            jitter=self.jitter,
+            interarrival=self.interarrival,
+        )
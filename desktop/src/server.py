@@ -1,10 +1,14 @@
 import socket
 import queue
-import json
 import threading
 import time
+from dataclasses import dataclass
 
 from . import ansi
+from .latency import LatencyMonitor
+from .protocol import Decoder
+from .ring import Latest, newest
+from .sequence import StreamStats
 
 
 def exception_handler(func):
@@ -31,23 +35,83 @@ def get_local_ip() -> str:
     return ip
 
 
+def source_id(addr: tuple[str, int]) -> str:
+    return f"{addr[0]}:{addr[1]}"
+
+
+@dataclass
+class ClientSession:
+    address: tuple[str, int]
+    decoder: Decoder
+    last_data_time: float = 0.0
+
+
 class Server:
     def __init__(self,
                  data_queue: queue.Queue,
                  event_queue: queue.Queue,
                  timeout: float,
+                 protocol: str = "auto",
+                 batch: bool = False,
+                 rcvbuf: int = 0,
+                 max_batch: int = 1024,
+                 fill_gaps: bool = False,
+                 multi_client: bool = False,
+                 latency: LatencyMonitor | None = None,
+                 latest: Latest | None = None,
                  ) -> None:
+        """
+        udp ingest server
+
+        every sample is stamped with its receive time from time.monotonic_ns()
+        in the "recv_ns" channel
+
+        arguments
+        ---------
+        protocol: str
+            wire protocol: auto, json or binary
+        batch: bool
+            drain every datagram already waiting in the socket on each wakeup
+            and put a single column block (dict[str, np.ndarray]) in the data
+            queue instead of one dict per sample
+        rcvbuf: int
+            socket receive buffer size in bytes. 0 keeps the system default
+        max_batch: int
+            maximum number of datagrams drained per wakeup
+        fill_gaps: bool
+            insert nan samples in place of lost ones to keep the columns aligned
+        multi_client: bool
+            keep one session per source address. events are put as
+            (event, source) and data as (source, data) tuples, where source is
+            "ip:port". otherwise every source is merged into a single session
+        latency: LatencyMonitor | None
+            monitor shared with the rest of the pipeline. the server records the
+            sender to server latency in the "receipt" stage
+        latest: Latest | None
+            mailbox that also gets the newest sample of every datagram, for
+            consumers that must not wait behind the data queue
+        """
         self.socket = None
+        self.address: tuple[str, int] | None = None
         self.data_queue = data_queue
         self.event_queue = event_queue
 
+        self.protocol = protocol
+        self.fill_gaps = fill_gaps
+
+        self.batch = batch
+        self.rcvbuf = rcvbuf
+        self.max_batch = max_batch
+
         self.timeout = timeout
-        self.client_address = None
-        self.last_data_time = 0.0
+        self.multi_client = multi_client
+        self.sessions: dict[tuple[str, int] | None, ClientSession] = {}
+        self.latency = latency if latency is not None else LatencyMonitor()
+        self.latest = latest
 
         self.running = False
 
-    def start(self, host: str, port: int) -> None:
+    def _resolve_host(self, host: str) -> str:
         if host == "auto":
             host = get_local_ip()
 
@@ -61,14 +125,77 @@ class Server:
             )
             host = "localhost"
 
+        return host
+
+    def start(self, host: str, port: int) -> None:
+        host = self._resolve_host(host)
+        self.address = (host, port)
+
         self.server_thread = threading.Thread(target=self._start, args=(host, port))
         self.server_thread.start()
 
-    @exception_handler
-    def _start(self, host: str, port: int) -> Exception | None:
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind((host, port))
+    def _session(self, addr: tuple[str, int]) -> ClientSession:
+        key = addr if self.multi_client else None
+
+        session = self.sessions.get(key)
+        if session is None:
+            decoder = Decoder(self.protocol, self.fill_gaps, "recv_ns", self.latency.stage("receipt"))
+            session = ClientSession(addr, decoder)
+            self.sessions[key] = session
+            self._connect(session)
+
+        return session
+
+    def _put_event(self, event: str, session: ClientSession) -> None:
+        if self.multi_client:
+            self.event_queue.put((event, source_id(session.address)))
+        else:
+            self.event_queue.put(event)
+
+    def _put_data(self, data, session: ClientSession) -> None:
+        if self.latest is not None:
+            self.latest.put(newest(data), source_id(session.address) if self.multi_client else None)
+
+        if self.multi_client:
+            self.data_queue.put((source_id(session.address), data))
+        else:
+            self.data_queue.put(data)
 
+    def _connect(self, session: ClientSession) -> None:
+        print(
+            f"{ansi.BOLD}{ansi.GREEN}-> client connected{ansi.RESET}",
+            f"   |> ip: {session.address[0]}",
+            f"   |> port: {session.address[1]}",
+            sep="\n",
+            end="\n\n",
+        )
+
+        self._put_event("connected", session)
+
+    def _disconnect(self, key: tuple[str, int] | None) -> None:
+        session = self.sessions.pop(key)
+        self._put_event("disconnected", session)
+
+        stats = session.decoder.tracker.stats()
+        # loss statistics are only available for sequenced streams
+        lines = [
+            f"   |> received: {stats.received}",
+            f"   |> lost: {stats.lost} ({stats.loss_rate*100:.2f}%)",
+            f"   |> reordered: {stats.reordered}",
+            f"   |> duplicates: {stats.duplicates}",
+            f"   |> jitter: {stats.jitter*1000:.2f} ms",
+        ] if stats.received else []
+
+        print(
+            f"{ansi.BOLD}{ansi.RED}-> client disconnected{ansi.RESET}",
+            f"   |> ip: {session.address[0]}",
+            f"   |> port: {session.address[1]}",
+            *lines,
+            sep="\n",
+            end="\n\n",
+        )
+
+    def _print_started(self, host: str, port: int) -> None:
         print(
             f"{ansi.BOLD}{ansi.BLUE}-> server started{ansi.RESET}",
             f"   |> host: {host}",
@@ -77,48 +204,103 @@ class Server:
             end="\n\n",
         )
 
+    def _receive(self, data: bytes, addr: tuple[str, int], recv_ns: int, now: float) -> None:
+        if not self.batch:
+            session = self._session(addr)
+            session.last_data_time = now
+
+            for sample in session.decoder.decode(data, recv_ns):
+                self._put_data(sample, session)
+            return
+
+        datagrams, addrs, recv_times = self._drain(data, addr, recv_ns)
+
+        # demultiplex the drained datagrams by source
+        groups: dict[tuple[str, int], tuple[list[bytes], list[int]]] = {}
+        for datagram, a, t in zip(datagrams, addrs, recv_times):
+            group = groups.setdefault(a, ([], []))
+            group[0].append(datagram)
+            group[1].append(t)
+
+        for a, (group_datagrams, group_times) in groups.items():
+            session = self._session(a)
+            session.last_data_time = now
+
+            block = session.decoder.decode_block(group_datagrams, group_times)
+            if block:
+                self._put_data(block, session)
+
+    def _check_timeouts(self, now: float) -> None:
+        for key, session in list(self.sessions.items()):
+            if now - session.last_data_time > self.timeout:
+                self._disconnect(key)
+
+    @exception_handler
+    def _start(self, host: str, port: int) -> Exception | None:
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.rcvbuf > 0:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+        self.socket.bind((host, port))
+
+        self._print_started(host, port)
+
         self.socket.settimeout(0.1)
 
         self.running = True
         while self.running:
             try:
                 data, addr = self.socket.recvfrom(4096)
-                now = time.time()
-                self.last_data_time = now
+                self._receive(data, addr, time.monotonic_ns(), time.time())
 
-                # new client connects
-                if self.client_address is None:
-                    self.client_address = addr
+                # with several clients a silent one never hits the socket timeout
+                if len(self.sessions) > 1:
+                    self._check_timeouts(time.time())
 
-                    print(
-                        f"{ansi.BOLD}{ansi.GREEN}-> client connected{ansi.RESET}",
-                        f"   |> ip: {addr[0]}",
-                        f"   |> port: {addr[1]}",
-                        sep="\n",
-                        end="\n\n",
-                    )
+            except socket.timeout:
+                self._check_timeouts(time.time())
 
-                    self.event_queue.put("connected")
+                continue
 
-                self.data_queue.put(json.loads(data.decode('utf-8')))
+    def _drain(self,
+               first: bytes,
+               addr: tuple[str, int],
+               recv_ns: int,
+               ) -> tuple[list[bytes], list[tuple[str, int]], list[int]]:
+        datagrams = [first]
+        addrs = [addr]
+        recv_times = [recv_ns]
 
-            except socket.timeout:
-                if self.client_address is not None:
-                    now = time.time()
-                    if now - self.last_data_time > self.timeout:
-                        self.event_queue.put("disconnected")
+        # a socket with a timeout waits for data before every read, so it is
+        # switched to non-blocking while draining
+        timeout = self.socket.gettimeout()  # type: ignore
+        self.socket.settimeout(0.0)  # type: ignore
+        try:
+            while len(datagrams) < self.max_batch:
+                try:
+                    data, a = self.socket.recvfrom(4096)  # type: ignore
+                except BlockingIOError:
+                    break
 
-                        print(
-                            f"{ansi.BOLD}{ansi.RED}-> client disconnected{ansi.RESET}",
-                            f"   |> ip: {self.client_address[0]}",
-                            f"   |> port: {self.client_address[1]}",
-                            sep="\n",
-                            end="\n\n",
-                        )
+                datagrams.append(data)
+                addrs.append(a)
+                recv_times.append(time.monotonic_ns())
 
-                        self.client_address = None
+        finally:
+            self.socket.settimeout(timeout)  # type: ignore
 
-                continue
+        return datagrams, addrs, recv_times
+
+    def stats(self, source: str | None = None) -> StreamStats | None:
+        """
+        live loss, reorder and jitter statistics of a client. source is
+        "ip:port" in multi-client mode, None for the first connected client
+        """
+        # the receiving thread adds and removes sessions meanwhile
+        for session in list(self.sessions.values()):
+            if source is None or source_id(session.address) == source:
+                return session.decoder.tracker.stats()
+
+        return None
 
     def stop(self) -> None:
         self.running = False
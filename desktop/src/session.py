@@ -0,0 +1,475 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import ansi
+from .checkpoint import CheckpointStore, MODES
+from .config import Config
+from .data import Data
+from .latency import LatencyMonitor
+from .learning import LearningMonitor
+from .model import Model, is_ensemble, ENSEMBLE_MODELS
+from .replay_buffer import ReplayBuffer
+
+
+def create_models(config: Config) -> list[tuple[Model, str | list[str]]]:
+    """
+    one model for every target, or a single model for all of them. with
+    `ensemble`, the per-target models are stacked into one
+    """
+    targets = list(config.model.targets)
+
+    if config.model.ensemble and not config.model.single_model and not is_ensemble(config.model):
+        print(
+            f"{ansi.BOLD}{ansi.YELLOW}-> ensemble not available{ansi.RESET}",
+            f"   |> model: {config.model.model}",
+            f"   |> supported: {', '.join(ENSEMBLE_MODELS)}",
+            "   |> using one model per target",
+            sep="\n",
+            end="\n\n",
+        )
+
+    if config.model.single_model or is_ensemble(config.model):
+        return [(Model(config.model, targets), targets)]
+
+    return [(Model(config.model, [target]), target) for target in targets]
+
+
+class ModelPool:
+    def __init__(self, config: Config, size: int = 1) -> None:
+        """
+        model sets built ahead on a background thread, so a sensor that
+        connects in multi-client mode does not trace models or spawn training
+        processes on the main loop
+
+        arguments
+        ---------
+        size: int
+            model sets kept ready
+        """
+        self.config = config
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.spares = deque(self.executor.submit(create_models, config) for _ in range(size))
+
+    def take(self) -> list[tuple[Model, str | list[str]]]:
+        """
+        a set of models, and the next one starts building. waits only if the
+        sensors connect faster than the sets are built
+        """
+        spare = self.spares.popleft()
+        self.spares.append(self.executor.submit(create_models, self.config))
+
+        return spare.result()
+
+    def wait(self) -> None:
+        """
+        waits until the sets kept ready are built
+        """
+        for spare in self.spares:
+            spare.result()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class Session:
+    def __init__(self,
+                 config: Config,
+                 source: str | None = None,
+                 models: list[tuple[Model, str | list[str]]] | None = None,
+                 latency: LatencyMonitor | None = None,
+                 checkpoints: CheckpointStore | None = None,
+                 ) -> None:
+        """
+        data, models and learning state of a connected sensor
+
+        arguments
+        ---------
+        source: str | None
+            "ip:port" of the sensor in multi-client mode. used to tag the saved
+            data
+        models: list[tuple[Model, str | list[str]]] | None
+            (model, target) pairs shared with other sessions or built ahead.
+            if None, the session creates its own
+        latency: LatencyMonitor | None
+            monitor where the time from the sample receipt to the main loop is
+            recorded in the "ingest" stage
+        checkpoints: CheckpointStore | None
+            store where the models are saved at disconnect and loaded from at
+            connect
+        """
+        if config.checkpoint.mode not in MODES:
+            raise ValueError(f"Unknown checkpoint mode: {config.checkpoint.mode}")
+
+        self.config = config
+        self.source = source
+
+        tag = source.replace(":", "_").replace(".", "-") if source is not None else ""
+        self.data = Data(
+            config.data.path,
+            config.data.save,
+            config.data.date_format,
+            tag=tag,
+            format=config.data.format,
+            chunk_size=config.data.chunk_size,
+            window=config.data.window,
+        )
+
+        self.models = models if models is not None else create_models(config)
+        self.latency = latency
+
+        # the sensor address without the ephemeral port
+        sensor = config.checkpoint.sensor if source is None else f"{config.checkpoint.sensor}@{source.split(':')[0]}"
+        self.checkpoints = checkpoints
+        self.checkpoint_key = checkpoints.key(config.model, config.checkpoint.object, sensor) if checkpoints else ""
+        self.pending = None
+        self.restored = False
+
+        # training samples of the whole session, all targets
+        self.buffer = ReplayBuffer(
+            config.model.buffer_size,
+            len(config.model.features),
+            len(config.model.targets),
+            strategy=config.model.buffer,
+            bins=config.model.buffer_bins,
+        )
+
+        # held-out samples and the adaptive learning phase
+        self.monitor = None
+        if config.learning.adaptive:
+            self.monitor = LearningMonitor(config.learning, len(config.model.features), list(config.model.targets))
+        self.validated_until = 0
+        self.next_validation = 0.0
+        self.validated_versions = ()
+
+        self.trained_until = 0
+        self.predicted_until = 0
+
+        # online models learn from every ingested sample instead of rounds
+        self.online = all(model.online for model, _ in self.models)
+        self.observed_until = 0
+
+        self.learning_time_exceeded = False
+        self.start_time = time.time()
+        self.connected = False
+
+        # ingest throughput
+        self.received = 0
+        self.first_update = 0.0
+        self.last_update = 0.0
+
+    def connect(self) -> None:
+        self.connected = True
+
+        self.trained_until = 0
+        self.predicted_until = 0
+        self.observed_until = 0
+
+        self.validated_until = 0
+        self.next_validation = 0.0
+        self.validated_versions = tuple(model.version for model, _ in self.models)
+        if self.monitor is not None:
+            self.monitor.reset()
+
+        self.learning_time_exceeded = False
+        self.start_time = time.time()
+
+        self.received = 0
+        self.first_update = self.last_update = time.monotonic()
+
+        self.data.clear()
+        self.buffer.clear()
+
+        # loaded in the background, applied before the first training round
+        self.restored = False
+        if self.checkpoints is not None:
+            self.pending = self.checkpoints.load(self.checkpoint_key)
+
+    def disconnect(self) -> None:
+        self.connected = False
+
+        self.data.save()
+        self.close()
+
+        if self.monitor is not None:
+            self.monitor.report()
+            if self.config.data.save:
+                self.monitor.save(self.data.sidecar("learning.csv"))
+
+        if self.checkpoints is not None:
+            self.pending = None
+            states = [model.checkpoint() for model, _ in self.models]
+
+            # untrained models never replace a checkpoint
+            if any(state["steps"] for state in states):
+                self.checkpoints.save(self.checkpoint_key, states)
+
+    def _restore(self) -> None:
+        if self.pending is None or not self.pending.done():
+            return
+
+        future, self.pending = self.pending, None
+
+        # a corrupt or outdated checkpoint falls back to a cold start
+        try:
+            states = future.result()
+            if states is None:
+                return
+
+            if len(states) != len(self.models):
+                raise ValueError(f"Checkpoint has {len(states)} models, expected {len(self.models)}")
+
+            for (model, _), state in zip(self.models, states):
+                model.check(state)
+
+            for (model, _), state in zip(self.models, states):
+                model.close()
+                model.restore(state)
+
+        except Exception as e:
+            print(
+                f"{ansi.BOLD}{ansi.YELLOW}-> checkpoint not loaded{ansi.RESET}",
+                f"   |> key: {self.checkpoint_key}",
+                f"   |> error: {e}",
+                "   |> starting from scratch",
+                sep="\n",
+                end="\n\n",
+            )
+            return
+
+        self.restored = True
+        if self.monitor is not None and self.config.checkpoint.mode == "skip":
+            self.monitor.skip()
+
+        print(
+            f"{ansi.BOLD}{ansi.GREEN}-> checkpoint loaded{ansi.RESET}",
+            f"   |> key: {self.checkpoint_key}",
+            f"   |> rounds: {max(state['rounds'] for state in states)} ({max(state['steps'] for state in states)} steps)",
+            f"   |> after: {(time.time() - self.start_time) * 1000:.0f} ms",
+            "   |> skipping the learning phase" if self.config.checkpoint.mode == "skip" else "   |> warm start",
+            sep="\n",
+            end="\n\n",
+        )
+
+    def close(self) -> None:
+        for model, _ in self.models:
+            model.close()
+
+    def update(self, item: dict) -> None:
+        # the ring buffer always hands out column blocks
+        if self.config.server.batch or self.config.server.buffer == "ring":
+            self.data.update_numpy(item)
+        else:
+            self.data.update(item)
+
+        self.received += np.size(next(iter(item.values()), []))
+        self.last_update = time.monotonic()
+
+        if self.latency is not None and "recv_ns" in item:
+            self.latency.record_many("ingest", time.monotonic_ns() - np.asarray(item["recv_ns"]))
+
+        if self.online and not self.learning_time_exceeded:
+            self.observe()
+
+    def observe(self) -> None:
+        """
+        updates the online models with the samples ingested since the last
+        call
+        """
+        # the checkpoint is loaded before the first update, the samples wait
+        self._restore()
+        if self.pending is not None:
+            return
+
+        features = self.config.model.features
+        targets = self.config.model.targets
+
+        x = np.array([self.data.since(f, self.observed_until) / 100 for f in features]).T
+        y = np.array([self.data.since(t, self.observed_until) for t in targets]).T
+
+        valid = np.isfinite(x).all(axis=1) & np.isfinite(y).all(axis=1)
+        if self.monitor is not None:
+            valid &= ~self.monitor.held_out(self.observed_until, len(x))
+        self.observed_until += len(x)
+        if not valid.any():
+            return
+
+        for model, target in self.models:
+            if isinstance(target, str):
+                model.observe(x[valid], y[valid, targets.index(target)])
+            else:
+                model.observe(x[valid], y[valid][:, [targets.index(t) for t in target]])
+
+    def predict(self) -> None:
+        data_len = len(self.data)
+
+        input_data = np.array([self.data.since(f, self.predicted_until) / 100 for f in self.config.model.features]).T
+
+        # every prediction is stored with the version of the weights behind it
+        preds = {}
+        for model, target in self.models:
+            pred, version = model.predict_tagged(input_data)
+            for t, p in ([(target, pred)] if isinstance(target, str) else zip(target, pred.T)):
+                preds[f"{t}_pred"] = p
+                preds[f"{t}_version"] = np.full(np.shape(p), version, dtype=float)
+
+        if all(p.ndim > 0 and len(p) > 0 for p in preds.values()):
+            self.data.update_numpy(preds)
+
+        self.predicted_until = data_len
+
+    def _predict_rows(self, x: np.ndarray) -> np.ndarray:
+        """
+        [n_samples, n_features] -> [n_samples, n_targets], from every model
+        """
+        targets = self.config.model.targets
+        y = np.empty((len(x), len(targets)))
+
+        for model, target in self.models:
+            pred = model.predict(x)
+            if isinstance(target, str):
+                y[:, targets.index(target)] = pred.reshape(len(x))
+            else:
+                y[:, [targets.index(t) for t in target]] = pred.reshape(len(x), -1)
+
+        return y
+
+    def _validate(self) -> None:
+        """
+        moves the new held-out samples into the validation set and evaluates
+        the inference models on it, at most once per interval
+        """
+        now = time.time()
+        if now < self.next_validation or self.monitor is None:
+            return
+        self.next_validation = now + self.config.learning.interval
+
+        features = self.config.model.features
+        targets = self.config.model.targets
+
+        x = np.array([self.data.since(f, self.validated_until) / 100 for f in features]).T
+        y = np.array([self.data.since(t, self.validated_until) for t in targets]).T
+        if not len(x):
+            return
+
+        held_out = self.monitor.held_out(self.validated_until, len(x))
+        held_out &= np.isfinite(x).all(axis=1) & np.isfinite(y).all(axis=1)
+        self.validated_until += len(x)
+        self.monitor.add(x[held_out], y[held_out])
+
+        # while learning, only new weights are evaluated, so a slow first
+        # round is not taken for a plateau
+        versions = tuple(model.version for model, _ in self.models)
+        if self.monitor.learning and versions == self.validated_versions:
+            return
+        self.validated_versions = versions
+
+        if self.monitor.evaluate(now - self.start_time, self._predict_rows) != "drift":
+            return
+
+        print(
+            f"{ansi.BOLD}{ansi.YELLOW}-> drift detected{ansi.RESET}",
+            f"   |> source: {self.source}" if self.source is not None else "",
+            f"   |> validation error: {self.monitor.error:.4f} (converged at {self.monitor.reference:.4f})",
+            "   |> switching back to learning",
+            sep="\n",
+            end="\n\n",
+        )
+        self.learning_time_exceeded = False
+
+    def learning(self) -> bool:
+        """
+        returns True while the session is still in the learning phase. the
+        first call after the learning time switches to hard inference. with
+        the skip mode, a loaded checkpoint ends the learning phase
+
+        with adaptive learning, the phase ends when the validation error is
+        low enough or stops improving, and starts again on a drift
+        """
+        self._restore()
+
+        if self.monitor is not None:
+            self._validate()
+            if self.monitor.learning:
+                return True
+
+        else:
+            skip = self.restored and self.config.checkpoint.mode == "skip"
+            if time.time()-self.start_time <= self.config.model.learning_time and not skip:
+                return True
+
+        # switch to hard inference
+        if not self.learning_time_exceeded:
+            reason = self.monitor.events[-1][1] if self.monitor is not None and self.monitor.events else ""
+            if reason:
+                title = "learning converged"
+            elif self.restored and self.config.checkpoint.mode == "skip":
+                title = "restored from checkpoint, skipping learning"
+            else:
+                title = "learning time exceeded"
+
+            print(
+                f"{ansi.BOLD}{ansi.YELLOW}-> {title}{ansi.RESET}",
+                f"   |> source: {self.source}" if self.source is not None else "",
+                f"   |> {reason}: validation error {self.monitor.error:.4f} after {time.time() - self.start_time:.1f} s" if reason else "",
+                "   |> switching to hard inference",
+                "   |> sending force data to server" if self.config.client.control else "",
+                sep="\n",
+                end="\n\n",
+            )
+
+            self.close()
+            self.learning_time_exceeded = True
+
+        return False
+
+    def throughput(self) -> float:
+        """
+        samples per second taken by the main loop since the connection
+        """
+        duration = self.last_update - self.first_update
+
+        return self.received / duration if duration > 0 else 0.0
+
+    def train(self) -> None:
+        """
+        moves the samples received since the last round into the replay
+        buffer and trains every model on max_samples rows drawn from it
+        """
+        # the checkpoint is loaded before the first round
+        self._restore()
+        if self.pending is not None or self.online:
+            return
+
+        data_len = len(self.data)
+        if data_len - self.trained_until < self.config.model.required_samples:
+            return
+
+        # the new samples wait for the next round
+        if any(model.is_training for model, _ in self.models):
+            return
+
+        features = self.config.model.features
+        targets = self.config.model.targets
+
+        x = np.array([self.data.since(f, self.trained_until) / 100 for f in features]).T
+        y = np.array([self.data.since(t, self.trained_until) for t in targets]).T
+
+        # drop the nan samples that fill lost datagrams and the held-out ones
+        valid = np.isfinite(x).all(axis=1) & np.isfinite(y).all(axis=1)
+        if self.monitor is not None:
+            valid &= ~self.monitor.held_out(self.trained_until, len(x))
+        self.buffer.add(x[valid], y[valid])
+        self.trained_until = data_len
+
+        x, y = self.buffer.sample(self.config.model.max_samples)
+        if not len(x):
+            return
+
+        for model, target in self.models:
+            if isinstance(target, str):
+                model.start(x, y[:, targets.index(target)], self.buffer.n_seen)
+            else:
+                model.start(x, y[:, [targets.index(t) for t in target]], self.buffer.n_seen)
@@ -0,0 +1,119 @@
+import secrets
+from multiprocessing import shared_memory
+
+import numpy as np
+import torch
+
+
+class SharedArray:
+    def __init__(self, shape: tuple[int, ...], dtype=np.float32, name: str | None = None, create: bool = True) -> None:
+        """
+        numpy array in shared memory. the creator owns the block and unlinks it
+        on close, other processes attach to it by name
+        """
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        self.owner = create
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=max(size, 1))
+
+        self.shape = shape
+        self.dtype = dtype
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self) -> None:
+        del self.array
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class WeightExchange:
+    # header: version, active buffer, sequence of buffer 0, sequence of buffer 1
+    VERSION = 0
+    ACTIVE = 1
+    SEQ = 2
+
+    def __init__(self, state: dict[str, torch.Tensor], name: str | None = None) -> None:
+        """
+        shared-memory double buffer of state_dict snapshots
+
+        the writer fills the inactive buffer and then flips the active index,
+        so a snapshot is published at once. every buffer has a sequence counter
+        that is odd while it is written, and the reader retries if it changed
+        while copying. neither side takes a lock
+
+        arguments
+        ---------
+        state: dict[str, torch.Tensor]
+            template of the state_dict. every tensor is stored as float32
+        name: str | None
+            exchange to attach to. a new one is created if None
+        """
+        self.keys = list(state.keys())
+        self.shapes = [tuple(state[k].shape) for k in self.keys]
+        sizes = [int(np.prod(s)) for s in self.shapes]
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(int)
+        n = int(self.offsets[-1])
+
+        create = name is None
+        self.name = name if name is not None else f"tf_{secrets.token_hex(6)}"
+
+        self.header = SharedArray((4,), np.int64, f"{self.name}_h", create)
+        self.buffers = SharedArray((2, n), np.float32, self.name, create)
+        if create:
+            self.header.array[:] = 0
+
+        self.last_version = 0
+
+    def publish(self, state: dict[str, torch.Tensor]) -> int:
+        header = self.header.array
+        b = 1 - int(header[self.ACTIVE])
+
+        header[self.SEQ + b] += 1
+        buffer = self.buffers.array[b]
+        for k, start, end in zip(self.keys, self.offsets[:-1], self.offsets[1:]):
+            buffer[start:end] = state[k].detach().reshape(-1).to(torch.float32).cpu().numpy()
+        header[self.SEQ + b] += 1
+
+        header[self.ACTIVE] = b
+        header[self.VERSION] += 1
+
+        return int(header[self.VERSION])
+
+    def read(self, state: dict[str, torch.Tensor], retries: int = 8) -> int | None:
+        """
+        copies the newest snapshot into `state` in place. returns its version,
+        or None if nothing new was published
+        """
+        header = self.header.array
+        for _ in range(retries):
+            version = int(header[self.VERSION])
+            if version == self.last_version:
+                return None
+
+            b = int(header[self.ACTIVE])
+            seq = int(header[self.SEQ + b])
+            if seq % 2:
+                continue
+
+            snapshot = self.buffers.array[b].copy()
+            if int(header[self.SEQ + b]) != seq:
+                continue
+
+            with torch.no_grad():
+                for k, shape, start, end in zip(self.keys, self.shapes, self.offsets[:-1], self.offsets[1:]):
+                    value = torch.from_numpy(snapshot[start:end]).reshape(shape)
+                    state[k].copy_(value.to(state[k].dtype))
+
+            self.last_version = version
+
+            return version
+
+        return None
+
+    def close(self) -> None:
+        self.buffers.close()
+        self.header.close()
@@ -0,0 +1,81 @@
+import time
+
+import numpy as np
+
+from . import ansi
+from .config import Config
+from .data import Data
+from .latency import LatencyMonitor
+from .server import Server
+
+
+class Summary:
+    def __init__(self, config: Config, latency: LatencyMonitor, server: Server, period: float) -> None:
+        """
+        periodic text summary with the interface of `Plotter`, for headless
+        runs. it does not import matplotlib
+
+        arguments
+        ---------
+        period: float
+            seconds between summaries
+        """
+        self.targets = config.model.targets
+        self.latency = latency
+        self.server = server
+        self.period = period
+
+        self.last_time = time.monotonic()
+        self.last_len = 0
+
+    def update(self, data: Data) -> None:
+        now = time.monotonic()
+        if now - self.last_time < self.period:
+            return
+
+        n = len(data)
+        rate = (n - self.last_len) / (now - self.last_time)
+        self.last_time = now
+        self.last_len = n
+
+        lines = [f"   |> samples: {n} ({rate:.1f} samples/s)"]
+
+        for t in self.targets:
+            measured = data[t] if t in data else np.array([])
+            predicted = data[f"{t}_pred"] if f"{t}_pred" in data else np.array([])
+            lines.append(f"   |> {t}: {_last(measured):.3f} | pred {_last(predicted):.3f}")
+
+        stats = self.server.stats()
+        if stats is not None and stats.received:
+            lines.append(f"   |> lost: {stats.lost} ({stats.loss_rate*100:.2f}%) | jitter {stats.jitter*1000:.2f} ms")
+
+        for name, s in self.latency.summary().items():
+            if s.count:
+                lines.append(f"   |> {name}: p50 {s.p50:.2f} ms | p95 {s.p95:.2f} ms | p99 {s.p99:.2f} ms")
+
+        print(
+            f"{ansi.BOLD}{ansi.CYAN}-> summary{ansi.RESET}",
+            *lines,
+            sep="\n",
+            end="\n\n",
+        )
+
+    def draw(self) -> None:
+        pass
+
+    def save(self) -> None:
+        pass
+
+    def clear(self) -> None:
+        self.last_time = time.monotonic()
+        self.last_len = 0
+
+    def close(self) -> None:
+        pass
+
+
+def _last(values: np.ndarray) -> float:
+    # newest finite value, nan samples fill lost datagrams
+    finite = values[-64:][np.isfinite(values[-64:])]
+
+    return float(finite[-1]) if len(finite) else np.nan
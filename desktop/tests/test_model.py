@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+import torch
+
+from src import load_config
+from src.model import Model
+
+
+GP_HYPERPARAMETERS = {"n_inducing_points": 16, "kernel": "rq", "mean": "constant"}
+
+
+def model_config(**kwargs):
+    config = load_config("configs/forces.toml").model
+
+    return config._replace(epochs=2, max_samples=128, backend="thread", inference="eager", **kwargs)
+
+
+@pytest.mark.parametrize("model", ["gp", "streaming_gp"])
+def test_gp_slot_matches_inference_model(model):
+    torch.manual_seed(0)
+    config = model_config(model=model, hyperparameters=GP_HYPERPARAMETERS, single_model=True)
+    targets = list(config.targets)
+
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((128, len(config.features))).astype(np.float32)
+    y = np.sin(x[:, :len(targets)]).astype(np.float32)
+
+    gp = Model(config, targets)
+    gp.train(x, y)
+
+    inference_model = gp.trainer.inference_model
+    # gpytorch caches the predictive terms in eval mode
+    inference_model.train()
+    inference_model.eval()
+
+    with torch.no_grad():
+        expected = inference_model.likelihood(inference_model(torch.from_numpy(x[:8]))).mean.numpy()
+
+    np.testing.assert_allclose(gp.predict(x[:8]), expected, atol=1e-4)
+
+
+@pytest.mark.parametrize("ensemble", [False, True])
+def test_bootstrap_masks_reach_the_heads(ensemble, monkeypatch):
+    torch.manual_seed(0)
+    config = model_config(model="multi_head_fnn", single_model=not ensemble, ensemble=ensemble)
+    targets = list(config.targets)
+    n_members = len(targets) if ensemble else 1
+
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal((128, len(config.features))).astype(np.float32)
+    y = np.sin(x[:, :len(targets)]).astype(np.float32)
+
+    fnn = Model(config, targets)
+    heads = fnn.trainer.train_model.net.heads if ensemble else fnn.trainer.train_model.heads
+    grads = []
+    heads.weight.register_hook(lambda grad: grads.append(grad.clone()))
+
+    # the first head of every member never draws a sample
+    def rand(*size):
+        masks = torch.zeros(*size)
+        masks[:, :n_members] = 1.0
+        return masks
+
+    monkeypatch.setattr(torch, "rand", rand)
+    fnn.train(x, y)
+
+    assert grads
+    for grad in grads:
+        # [n_heads * n_outputs, hidden], or [n_members, hidden, n_heads]
+        first, rest = (grad[..., 0], grad[..., 1:]) if ensemble else (grad[:len(targets)], grad[len(targets):])
+        assert torch.all(first == 0)
+        assert torch.any(rest != 0)
@@ -1,13 +1,17 @@
 import queue
 import sys
+import time
 
 import numpy as np
 
 from panda import Panda
 from src import (
     Server,
+    AsyncServer,
     ansi,
     load_config,
+    RingBuffer,
+    LatencyMonitor,
 )
 
 
@@ -47,9 +51,15 @@ def main() -> None:
     # queues
     data_queue = queue.Queue()
     event_queue = queue.Queue()
+    if config.server.buffer == "ring":
+        data_queue = RingBuffer(config.server.ring_size, policy=config.server.ring_policy)
+
+    # receipt, desktop and control latencies
+    latency = LatencyMonitor()
 
     # server
-    server = Server(data_queue, event_queue, config.server.timeout)
+    server_cls = AsyncServer if config.server.backend == "asyncio" else Server
+    server = server_cls(data_queue, event_queue, config.server.timeout, config.server.protocol, latency)
     server.start(host=config.server.ip, port=config.server.port)
 
     # variables
@@ -73,10 +83,21 @@ def main() -> None:
             # client has just disconnected
             if event == "disconnected" and client_connected:
                 client_connected = False
+                latency.report()
+                latency.reset()
                 continue
 
-            while not data_queue.empty():
-                data = data_queue.get()
+            # only the newest sample drives the attractor
+            new_data = None
+            if isinstance(data_queue, RingBuffer):
+                new_data = data_queue.latest()
+            else:
+                while not data_queue.empty():
+                    new_data = data_queue.get()
+
+            if new_data is not None:
+                data = new_data
+                latency.record("desktop", data.get("age_ns", np.nan))
 
                 f = np.array([
                     data["fz"],
@@ -114,6 +135,9 @@ def main() -> None:
                 duration=0.05,
             )
 
+            if new_data is not None:
+                latency.record("control", time.monotonic_ns() - data.get("recv_ns", np.nan))
+
         except:
             print(
                 f"{ansi.BOLD}{ansi.YELLOW}-> user interrupt{ansi.RESET}",
@@ -123,6 +147,8 @@ def main() -> None:
                 end="\n\n",
             )
 
+            latency.report()
+
             if config.panda.use_gripper:
                 panda.grasp(0.08, 0.1, 5)
 
@@ -1,2 +1,5 @@
 from .server import Server
+from .async_server import AsyncServer
 from .config import load_config
+from .ring import RingBuffer
+from .latency import LatencyMonitor
@@ -0,0 +1,135 @@
+import asyncio
+import socket
+import queue
+import threading
+import time
+from typing import Optional, Tuple
+
+from .latency import LatencyMonitor
+from .server import Server
+
+
+class _IngestProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "AsyncServer") -> None:
+        self.server = server
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]) -> None:
+        self.server._on_datagram(data, addr)
+
+
+class AsyncServer(Server):
+    def __init__(self,
+                 data_queue: queue.Queue,
+                 event_queue: queue.Queue,
+                 timeout: float,
+                 protocol: str = "auto",
+                 latency: Optional[LatencyMonitor] = None,
+                 loop: Optional[asyncio.AbstractEventLoop] = None,
+                 ) -> None:
+        """
+        asyncio udp ingest server with the same interface as `Server`
+
+        disconnects are detected by a watchdog timer instead of socket polling
+        and `stop` returns as soon as the transport is closed
+
+        arguments
+        ---------
+        loop: Optional[asyncio.AbstractEventLoop]
+            event loop to run on, so other coroutines can share it. if None,
+            the server runs its own loop in a background thread
+        """
+        super().__init__(data_queue, event_queue, timeout, protocol, latency)
+
+        self.loop = loop
+        self.owns_loop = loop is None
+        self.loop_thread = None
+
+        self.transport = None
+        self.watchdog = None
+
+    def start(self, host: str, port: int) -> None:
+        host = self._resolve_host(host)
+
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+            self.loop_thread.start()
+
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+
+        # called from a coroutine on the shared loop
+        if running_loop is self.loop:
+            self.loop.create_task(self.serve(host, port))
+            return
+
+        asyncio.run_coroutine_threadsafe(self.serve(host, port), self.loop).result()
+
+    async def serve(self, host: str, port: int) -> None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((host, port))
+        self.socket = sock
+
+        self.transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: _IngestProtocol(self),
+            sock=sock,
+        )
+        self.running = True
+
+        self._print_started(host, port)
+
+    def _on_datagram(self, data: bytes, addr: Tuple[str, int]) -> None:
+        recv_time = self.loop.time()  # type: ignore
+        self.last_data_time = recv_time
+
+        # new client connects
+        if self.client_address is None:
+            self._connect(addr)
+            self._arm_watchdog(self.timeout)
+
+        for sample in self.decoder.decode(data, time.monotonic_ns()):
+            self.data_queue.put(sample)
+
+    def _arm_watchdog(self, delay: float) -> None:
+        self.watchdog = self.loop.call_later(delay, self._check_liveness)  # type: ignore
+
+    def _check_liveness(self) -> None:
+        self.watchdog = None
+        if self.client_address is None:
+            return
+
+        # re-arm for the remaining time instead of resetting on every datagram
+        remaining = self.last_data_time + self.timeout - self.loop.time()  # type: ignore
+        if remaining > 0:
+            self._arm_watchdog(remaining)
+            return
+
+        self._disconnect()
+
+    def _close(self) -> None:
+        if self.watchdog is not None:
+            self.watchdog.cancel()
+            self.watchdog = None
+
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+            self.socket = None
+
+        # let the transport release the socket before the loop stops
+        if self.owns_loop:
+            self.loop.call_soon(self.loop.stop)  # type: ignore
+
+    def stop(self) -> None:
+        self.running = False
+        if self.loop is None or self.loop.is_closed():
+            return
+
+        self.loop.call_soon_threadsafe(self._close)
+
+        if self.loop_thread is not None:
+            self.loop_thread.join()
+            self.loop.close()
+            self.loop_thread = None
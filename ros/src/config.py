@@ -18,6 +18,11 @@ class ServerConfig(NamedTuple):
     ip: str
     port: int
     timeout: int
+    backend: str
+    protocol: str
+    buffer: str
+    ring_size: int
+    ring_policy: str
 
 
 class ForceConfig(NamedTuple):
@@ -55,6 +60,11 @@ def load_config() -> Config:
         ip=config["server"]["ip"],
         port=config["server"]["port"],
         timeout=config["server"]["timeout"],
+        backend=config["server"]["backend"],
+        protocol=config["server"]["protocol"],
+        buffer=config["server"]["buffer"],
+        ring_size=config["server"]["ring_size"],
+        ring_policy=config["server"]["ring_policy"],
     )
 
     # force
@@ -1,11 +1,13 @@
 import socket
 import queue
-import json
 import threading
 import time
-from typing import Union
+from typing import Optional, Union, Tuple
 
 from . import ansi
+from .latency import LatencyMonitor
+from .protocol import Decoder
+from .sequence import StreamStats
 
 
 def exception_handler(func):
@@ -37,8 +39,26 @@ class Server:
                  data_queue: queue.Queue,
                  event_queue: queue.Queue,
                  timeout: float,
+                 protocol: str = "auto",
+                 latency: Optional[LatencyMonitor] = None,
                  ) -> None:
+        """
+        udp server that receives the force predictions
+
+        every sample is stamped with its receive time from time.monotonic_ns()
+        in the "recv_ns" channel
+
+        arguments
+        ---------
+        protocol: str
+            wire protocol: auto, json or binary
+        latency: Optional[LatencyMonitor]
+            monitor where the client to server latency is recorded in the
+            "receipt" stage
+        """
         self.socket = None
+        self.latency = latency if latency is not None else LatencyMonitor()
+        self.decoder = Decoder(protocol, stamp="recv_ns", latency=self.latency.stage("receipt"))
         self.data_queue = data_queue
         self.event_queue = event_queue
 
@@ -48,7 +68,7 @@ class Server:
 
         self.running = False
 
-    def start(self, host: str, port: int) -> None:
+    def _resolve_host(self, host: str) -> str:
         if host == "auto":
             host = get_local_ip()
 
@@ -62,14 +82,53 @@ class Server:
             )
             host = "localhost"
 
+        return host
+
+    def start(self, host: str, port: int) -> None:
+        host = self._resolve_host(host)
+
         self.server_thread = threading.Thread(target=self._start, args=(host, port))
         self.server_thread.start()
 
-    @exception_handler
-    def _start(self, host: str, port: int) -> Union[Exception, None]:
-        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.socket.bind((host, port))
+    def _connect(self, addr: Tuple[str, int]) -> None:
+        self.client_address = addr
+        self.decoder.tracker.reset()
+
+        print(
+            f"{ansi.BOLD}{ansi.GREEN}-> client connected{ansi.RESET}",
+            f"   |> ip: {addr[0]}",
+            f"   |> port: {addr[1]}",
+            sep="\n",
+            end="\n\n",
+        )
+
+        self.event_queue.put("connected")
+
+    def _disconnect(self) -> None:
+        self.event_queue.put("disconnected")
+
+        stats = self.stats()
+        # loss statistics are only available for sequenced streams
+        lines = [
+            f"   |> received: {stats.received}",
+            f"   |> lost: {stats.lost} ({stats.loss_rate*100:.2f}%)",
+            f"   |> reordered: {stats.reordered}",
+            f"   |> duplicates: {stats.duplicates}",
+            f"   |> jitter: {stats.jitter*1000:.2f} ms",
+        ] if stats.received else []
+
+        print(
+            f"{ansi.BOLD}{ansi.RED}-> client disconnected{ansi.RESET}",
+            f"   |> ip: {self.client_address[0]}",  # type: ignore
+            f"   |> port: {self.client_address[1]}",  # type: ignore
+            *lines,
+            sep="\n",
+            end="\n\n",
+        )
 
+        self.client_address = None
+
+    def _print_started(self, host: str, port: int) -> None:
         print(
             f"{ansi.BOLD}{ansi.BLUE}-> server started{ansi.RESET}",
             f"   |> host: {host}",
@@ -78,46 +137,35 @@ class Server:
             end="\n\n",
         )
 
+    @exception_handler
+    def _start(self, host: str, port: int) -> Union[Exception, None]:
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((host, port))
+
+        self._print_started(host, port)
+
         self.socket.settimeout(0.1)
 
         self.running = True
         while self.running:
             try:
                 data, addr = self.socket.recvfrom(4096)
+                recv_ns = time.monotonic_ns()
                 now = time.time()
                 self.last_data_time = now
 
                 # new client connects
                 if self.client_address is None:
-                    self.client_address = addr
-
-                    print(
-                        f"{ansi.BOLD}{ansi.GREEN}-> client connected{ansi.RESET}",
-                        f"   |> ip: {addr[0]}",
-                        f"   |> port: {addr[1]}",
-                        sep="\n",
-                        end="\n\n",
-                    )
+                    self._connect(addr)
 
-                    self.event_queue.put("connected")
-
-                self.data_queue.put(json.loads(data.decode('utf-8')))
+                for sample in self.decoder.decode(data, recv_ns):
+                    self.data_queue.put(sample)
 
             except socket.timeout:
                 if self.client_address is not None:
                     now = time.time()
                     if now - self.last_data_time > self.timeout:
-                        self.event_queue.put("disconnected")
-
-                        print(
-                            f"{ansi.BOLD}{ansi.RED}-> client disconnected{ansi.RESET}",
-                            f"   |> ip: {self.client_address[0]}",
-                            f"   |> port: {self.client_address[1]}",
-                            sep="\n",
-                            end="\n\n",
-                        )
-
-                        self.client_address = None
+                        self._disconnect()
 
                 continue
 
@@ -129,3 +177,9 @@ class Server:
         self.socket.close()
         self.socket = None
         self.server_thread.join()
+
+    def stats(self) -> StreamStats:
+        """
+        live loss, reorder and jitter statistics of the current client
+        """
+        return self.decoder.tracker.stats()